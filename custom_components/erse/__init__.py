@@ -1,32 +1,83 @@
 """The Entidade Reguladora dos Serviços Energéticos integration."""
 import asyncio
 import logging
+from datetime import datetime
 
 import homeassistant.helpers.config_validation as cv
 import voluptuous as vol
 from homeassistant.components import persistent_notification
+from homeassistant.components.recorder import get_instance
 from homeassistant.components.sensor import ATTR_LAST_RESET
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import ATTR_CONFIG_ENTRY_ID
+from homeassistant.core import (
+    CALLBACK_TYPE,
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.helpers.typing import ConfigType
 from homeassistant.util import dt as dt_util
 from pyerse.comercializador import POTENCIA, Comercializador, Opcao_Horaria, Tarifa
 from pyerse.simulador import Simulador
 
+from . import websocket_api
 from .const import (
+    ATTR_BOUNDARY,
+    ATTR_COST,
+    ATTR_ENTRY_ID,
+    ATTR_NEXT_TARIFF,
+    ATTR_NEXT_TRANSITION,
+    ATTR_PREVIOUS_TARIFF,
+    ATTR_TARIFF,
+    BATTERY_SOC_STEPS,
+    CONF_APPLIANCES,
+    CONF_CAPACITY,
     CONF_CHEIAS,
     CONF_CYCLE,
+    CONF_EFFICIENCY,
+    CONF_END,
+    CONF_FEED_IN_RATE,
+    CONF_FILENAME,
     CONF_FORA_DE_VAZIO,
+    CONF_FORMAT,
+    CONF_HOURS,
     CONF_INSTALLED_POWER,
+    CONF_LOAD,
+    CONF_MATRIX,
+    CONF_MAX_CHARGE_POWER,
+    CONF_MAX_DISCHARGE_POWER,
     CONF_NORMAL,
     CONF_OPERATOR,
     CONF_PLAN,
     CONF_PONTA,
     CONF_POWER_COST,
+    CONF_START,
+    CONF_STATE_OF_CHARGE,
     CONF_VAZIO,
+    COST_PRECISION,
     DOMAIN,
+    ENERGY_PRECISION,
+    EVENT_TARIFF_CHANGED,
+    SIGNAL_PRICES_UPDATED,
+    SIMUL_MAX_PARALLEL,
 )
+from .battery import SLOT_HOURS, optimize_battery
+from .export import EXPORT_FORMATS, FORMAT_CSV, export_statistics
+from .feed import FEED_TARIFF
+from .meters import async_entry_meters
+from .models import ERSEData
+from .prices import PriceHistory, prices_store
+from .timeline import SLOT, TariffTimeline
+
+PLATFORMS = ["sensor", "calendar"]
 
-PLATFORMS = ["sensor"]
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -66,10 +117,18 @@ def valid_plan(config):
     )
 
 
+def valid_power(config):
+    # every contracted power is simulated with the matrix
+    if config[CONF_MATRIX] or CONF_INSTALLED_POWER in config:
+        return config
+    raise vol.Invalid(f"{CONF_INSTALLED_POWER} is required unless {CONF_MATRIX} is set")
+
+
 SIMUL_SCHEMA = vol.Schema(
     vol.All(
         {
-            vol.Required(CONF_INSTALLED_POWER): vol.In(POTENCIA),
+            vol.Optional(CONF_INSTALLED_POWER): vol.In(POTENCIA),
+            vol.Optional(CONF_MATRIX, default=False): cv.boolean,
             vol.Optional(CONF_PONTA): cv.entity_id,
             vol.Optional(CONF_CHEIAS): cv.entity_id,
             vol.Optional(CONF_VAZIO): cv.entity_id,
@@ -77,9 +136,90 @@ SIMUL_SCHEMA = vol.Schema(
             vol.Optional(CONF_NORMAL): cv.entity_id,
         },
         valid_plan,
+        valid_power,
     )
 )
 
+EXPORT_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(CONF_START): cv.datetime,
+        vol.Optional(CONF_END): cv.datetime,
+        vol.Required(CONF_FILENAME): cv.string,
+        vol.Optional(CONF_FORMAT, default=FORMAT_CSV): vol.In(EXPORT_FORMATS),
+    }
+)
+
+
+BATTERY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(CONF_CAPACITY): vol.All(vol.Coerce(float), vol.Range(min=0.1)),
+        vol.Required(CONF_MAX_CHARGE_POWER): vol.All(
+            vol.Coerce(float), vol.Range(min=0)
+        ),
+        vol.Required(CONF_MAX_DISCHARGE_POWER): vol.All(
+            vol.Coerce(float), vol.Range(min=0)
+        ),
+        vol.Optional(CONF_EFFICIENCY, default=0.9): vol.All(
+            vol.Coerce(float), vol.Range(min=0.1, max=1)
+        ),
+        vol.Optional(CONF_STATE_OF_CHARGE, default=0): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=100)
+        ),
+        vol.Required(CONF_LOAD): vol.All(
+            cv.ensure_list,
+            [vol.Coerce(float)],
+            vol.Any(vol.Length(min=1, max=1), vol.Length(min=24, max=24)),
+        ),
+        vol.Optional(CONF_HOURS, default=24): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=48)
+        ),
+    }
+)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Register the services that act on a config entry."""
+
+    async def async_handle_export(service: ServiceCall) -> ServiceResponse:
+        return await async_export(hass, service)
+
+    hass.services.async_register(
+        DOMAIN,
+        "export",
+        async_handle_export,
+        schema=EXPORT_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def async_handle_battery_schedule(service: ServiceCall) -> ServiceResponse:
+        return await async_battery_schedule(hass, service)
+
+    hass.services.async_register(
+        DOMAIN,
+        "battery_schedule",
+        async_handle_battery_schedule,
+        schema=BATTERY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    return True
+
+
+@callback
+def async_get_entry_data(
+    hass: HomeAssistant, service: ServiceCall
+) -> tuple[ConfigEntry, ERSEData]:
+    """Config entry of a service call and its runtime data."""
+    entry_id = service.data[ATTR_CONFIG_ENTRY_ID]
+    entry = hass.config_entries.async_get_entry(entry_id)
+    if entry is None or entry.domain != DOMAIN:
+        raise HomeAssistantError(f"Config entry {entry_id} not found")
+    if (erse_data := hass.data.get(DOMAIN, {}).get(entry_id)) is None:
+        raise HomeAssistantError(f"Config entry {entry.title} is not loaded")
+    return entry, erse_data
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up Entidade Reguladora dos Serviços Energéticos from a config entry."""
@@ -99,11 +239,72 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         operador.plano.definir_custo_kWh(Tarifa(tariff), costs[tariff.name])
     operador.plano.definir_custo_potencia(costs[CONF_POWER_COST])
 
-    hass.data[DOMAIN][entry.entry_id] = operador
+    prices = PriceHistory(prices_store(hass, entry.entry_id))
+    await prices.async_load()
+    await prices.async_add(dt_util.utcnow(), tariff_prices(operador))
+
+    hass.data[DOMAIN][entry.entry_id] = ERSEData(
+        operator=operador,
+        timeline=TariffTimeline(operador.plano),
+        appliances=costs.get(CONF_APPLIANCES, entry.data.get(CONF_APPLIANCES, [])),
+        feed_in_rate=costs.get(CONF_FEED_IN_RATE, entry.data.get(CONF_FEED_IN_RATE, 0)),
+        prices=prices,
+    )
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
-    async def async_simular(service):
+    websocket_api.async_setup(hass)
+
+    erse_data = hass.data[DOMAIN][entry.entry_id]
+    timeline = erse_data.timeline
+
+    current_tariff = timeline.tariff_at()
+    erse_data.feed.async_set(FEED_TARIFF, current_tariff.value)
+    unsub_transition: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_schedule_transition(transition: tuple[datetime, Tarifa] | None) -> None:
+        nonlocal unsub_transition
+        unsub_transition = None
+        if transition is not None:
+            unsub_transition = async_track_point_in_time(
+                hass, async_tariff_changed, transition[0]
+            )
+
+    @callback
+    def async_tariff_changed(boundary: datetime) -> None:
+        """Fire the tariff change at the exact boundary and schedule the next."""
+        nonlocal current_tariff
+        previous_tariff, current_tariff = current_tariff, timeline.tariff_at(boundary)
+        transition = timeline.next_transition(boundary)
+        async_schedule_transition(transition)
+
+        if current_tariff == previous_tariff:
+            return
+
+        erse_data.feed.async_set(FEED_TARIFF, current_tariff.value)
+        hass.bus.async_fire(
+            EVENT_TARIFF_CHANGED,
+            {
+                ATTR_ENTRY_ID: entry.entry_id,
+                ATTR_PREVIOUS_TARIFF: previous_tariff.value,
+                ATTR_TARIFF: current_tariff.value,
+                ATTR_COST: operador.plano.custo_tarifa(current_tariff),
+                ATTR_BOUNDARY: boundary.isoformat(),
+                ATTR_NEXT_TARIFF: transition[1].value if transition else None,
+                ATTR_NEXT_TRANSITION: transition[0].isoformat() if transition else None,
+            },
+        )
+
+    @callback
+    def async_cancel_transition() -> None:
+        if unsub_transition is not None:
+            unsub_transition()
+
+    async_schedule_transition(timeline.next_transition())
+    entry.async_on_unload(async_cancel_transition)
+
+    async def async_simular(service: ServiceCall) -> ServiceResponse:
         data = {
             Tarifa.PONTA: service.data.get(CONF_PONTA),
             Tarifa.CHEIAS: service.data.get(CONF_CHEIAS),
@@ -125,92 +326,243 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
                 ]
                 last_reset = dt_util.parse_datetime(last_reset).strftime("%Y-%m-%d")
 
-        potencia = service.data[CONF_INSTALLED_POWER]
-
-        _LOGGER.debug(
-            "Simular potencia de %s, desde dia %s, com valores %s",
-            potencia,
-            last_reset,
-            data,
-        )
-        simulador = Simulador(potencia, last_reset)
-
-        _LOGGER.debug("simular simples")
-        simulacoes = [
-            (
-                Opcao_Horaria.SIMPLES,
-                await hass.async_add_executor_job(
-                    simulador.melhor_tarifa_simples, sum(data.values())
-                ),
-            )
-        ]  # Simples
-
+        # consumption of each hourly option, shared by every simulated power
+        consumos = [
+            (Opcao_Horaria.SIMPLES, "melhor_tarifa_simples", (sum(data.values()),))
+        ]
         if Tarifa.PONTA in data:
-            _LOGGER.debug("simular tri-horario")
-            simulacoes.append(
+            consumos.append(
                 (
                     Opcao_Horaria.TRI_HORARIA,
-                    await hass.async_add_executor_job(
-                        simulador.melhor_tarifa_trihorario,
-                        data[Tarifa.PONTA],
-                        data[Tarifa.CHEIAS],
-                        data[Tarifa.VAZIO],
-                    ),
+                    "melhor_tarifa_trihorario",
+                    (data[Tarifa.PONTA], data[Tarifa.CHEIAS], data[Tarifa.VAZIO]),
                 )
             )
-            _LOGGER.debug("simular downgrade para bi-horario")
-            simulacoes.append(
+            # downgrade para bi-horario
+            consumos.append(
                 (
                     Opcao_Horaria.BI_HORARIA,
-                    await hass.async_add_executor_job(
-                        simulador.melhor_tarifa_bihorario,
-                        data[Tarifa.PONTA] + data[Tarifa.CHEIAS],
-                        data[Tarifa.VAZIO],
-                    ),
+                    "melhor_tarifa_bihorario",
+                    (data[Tarifa.PONTA] + data[Tarifa.CHEIAS], data[Tarifa.VAZIO]),
                 )
             )
-
         if Tarifa.FORA_DE_VAZIO in data:
-            _LOGGER.debug("simular bi-horario")
-            simulacoes.append(
+            consumos.append(
                 (
                     Opcao_Horaria.BI_HORARIA,
+                    "melhor_tarifa_bihorario",
+                    (data[Tarifa.FORA_DE_VAZIO], data[Tarifa.VAZIO]),
+                )
+            )
+
+        if service.data[CONF_MATRIX]:
+            potencias = POTENCIA
+        else:
+            potencias = [service.data[CONF_INSTALLED_POWER]]
+
+        _LOGGER.debug(
+            "Simular potencias %s, desde dia %s, com valores %s",
+            potencias,
+            last_reset,
+            data,
+        )
+        simuladores = {
+            potencia: Simulador(potencia, last_reset) for potencia in potencias
+        }
+        limite = asyncio.Semaphore(SIMUL_MAX_PARALLEL)
+
+        async def simular(potencia, opcao_horaria, metodo, consumo):
+            async with limite:
+                _LOGGER.debug("simular %s kVA %s", potencia, opcao_horaria)
+                return (
+                    potencia,
+                    opcao_horaria,
                     await hass.async_add_executor_job(
-                        simulador.melhor_tarifa_bihorario,
-                        data[Tarifa.FORA_DE_VAZIO],
-                        data[Tarifa.VAZIO],
+                        getattr(simuladores[potencia], metodo), *consumo
                     ),
                 )
-            )
+
+        resultados = await asyncio.gather(
+            *[
+                simular(potencia, *consumo)
+                for potencia in potencias
+                for consumo in consumos
+            ],
+            return_exceptions=True,
+        )
+
+        simulacoes = []
+        for resultado in resultados:
+            if isinstance(resultado, Exception):
+                _LOGGER.error("Simulação falhou: %s", resultado)
+            else:
+                simulacoes.append(resultado)
 
         _LOGGER.debug(simulacoes)
 
-        opcao_horaria, (melhor_plano, estimativa) = min(
-            simulacoes, key=lambda a: a[1][1]
+        if not simulacoes:
+            raise HomeAssistantError("Simulador ERSE não devolveu resultados")
+
+        potencia, opcao_horaria, (melhor_plano, estimativa) = min(
+            simulacoes, key=lambda a: a[2][1]
         )
 
+        if service.data[CONF_MATRIX]:
+            opcao_horaria = f"{opcao_horaria} com {potencia} kVA"
+
         persistent_notification.async_create(
             hass,
             f"De acordo com o simulador da ERSE o melhor plano com base nos consumos actuais é o <{melhor_plano}> em opção {opcao_horaria}, estaria a pagar custos fixos + energia {round(estimativa,2)} €. Por favor confirme este valor em https://simulador.precos.erse.pt/eletricidade/",
             "Simulador ERSE",
         )
 
-    hass.services.async_register(DOMAIN, "simular", async_simular, schema=SIMUL_SCHEMA)
+        if not service.return_response:
+            return None
+
+        matriz = {}
+        for potencia, opcao_horaria, (plano, estimativa) in simulacoes:
+            matriz.setdefault(str(potencia), {})[opcao_horaria.value] = {
+                "plano": plano,
+                "estimativa": round(estimativa, COST_PRECISION),
+            }
+        return matriz
+
+    hass.services.async_register(
+        DOMAIN,
+        "simular",
+        async_simular,
+        schema=SIMUL_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
 
     entry.async_on_unload(entry.add_update_listener(async_update_options))
 
     return True
 
 
+async def async_export(hass: HomeAssistant, service: ServiceCall) -> ServiceResponse:
+    """Export the hourly consumption and cost of the tariff meters of an entry."""
+    entry, erse_data = async_get_entry_data(hass, service)
+    operador = erse_data.operator
+
+    filename = hass.config.path(service.data[CONF_FILENAME])
+    if not hass.config.is_allowed_path(filename):
+        raise HomeAssistantError(f"Cannot write to {filename}, path not allowed")
+
+    start = dt_util.as_utc(dt_util.as_local(service.data[CONF_START]))
+    end = dt_util.as_utc(dt_util.as_local(service.data.get(CONF_END, dt_util.now())))
+
+    meters = async_entry_meters(hass, entry, operador.plano.tarifas)
+    _LOGGER.debug("Exportar %s de %s a %s para %s", meters, start, end, filename)
+    rows = await get_instance(hass).async_add_executor_job(
+        export_statistics,
+        hass,
+        filename,
+        service.data[CONF_FORMAT],
+        start,
+        end,
+        meters,
+        erse_data.prices,
+    )
+
+    if not service.return_response:
+        return None
+    return {"filename": filename, "rows": rows}
+
+
+async def async_battery_schedule(
+    hass: HomeAssistant, service: ServiceCall
+) -> ServiceResponse:
+    """Plan the battery over the next hours at the prices of an entry."""
+    _, erse_data = async_get_entry_data(hass, service)
+    operador = erse_data.operator
+
+    now = dt_util.now()
+    start = now.replace(minute=now.minute // 15 * 15, second=0, microsecond=0)
+    slots = [start + index * SLOT for index in range(service.data[CONF_HOURS] * 4)]
+
+    tariffs = [erse_data.timeline.tariff_at(slot) for slot in slots]
+    prices = [operador.plano.custo_tarifa(tariff) for tariff in tariffs]
+
+    # load profile in kW by hour of the day, or a constant load
+    profile = service.data[CONF_LOAD]
+    load = [
+        (profile[slot.hour] if len(profile) == 24 else profile[0]) * SLOT_HOURS
+        for slot in slots
+    ]
+
+    capacity = service.data[CONF_CAPACITY]
+    schedule = await hass.async_add_executor_job(
+        optimize_battery,
+        prices,
+        load,
+        capacity,
+        service.data[CONF_MAX_CHARGE_POWER],
+        service.data[CONF_MAX_DISCHARGE_POWER],
+        service.data[CONF_EFFICIENCY],
+        capacity * service.data[CONF_STATE_OF_CHARGE] / 100,
+        BATTERY_SOC_STEPS,
+    )
+
+    return {
+        "cost": round(sum(plan.cost for plan in schedule), COST_PRECISION),
+        "cost_without_battery": round(
+            sum(price * energy for price, energy in zip(prices, load)),
+            COST_PRECISION,
+        ),
+        "schedule": [
+            {
+                "start": slot.isoformat(),
+                "tariff": tariff.value,
+                "unit_price": price,
+                "charge": round(plan.charge, ENERGY_PRECISION),
+                "discharge": round(plan.discharge, ENERGY_PRECISION),
+                "grid": round(plan.grid, ENERGY_PRECISION),
+                "state_of_charge": round(plan.soc / capacity * 100, 1),
+            }
+            for slot, tariff, price, plan in zip(slots, tariffs, prices, schedule)
+        ],
+    }
+
+
 async def async_update_options(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
     """Update options."""
-    operador = hass.data[DOMAIN][config_entry.entry_id]
+    data = hass.data[DOMAIN][config_entry.entry_id]
+
+    appliances = config_entry.options.get(
+        CONF_APPLIANCES, config_entry.data.get(CONF_APPLIANCES, [])
+    )
+    if appliances != data.appliances:
+        # appliance cost sensors are created at setup
+        await hass.config_entries.async_reload(config_entry.entry_id)
+        return
+
+    operador = data.operator
 
     for tariff in operador.plano.tarifas:
         operador.plano.definir_custo_kWh(
             Tarifa(tariff), config_entry.options[tariff.name]
         )
     operador.plano.definir_custo_potencia(config_entry.options[CONF_POWER_COST])
+    # energy consumed from now on is priced with the new prices
+    await data.prices.async_add(dt_util.utcnow(), tariff_prices(operador))
+    data.feed_in_rate = config_entry.options.get(
+        CONF_FEED_IN_RATE, config_entry.data.get(CONF_FEED_IN_RATE, 0)
+    )
+
+    async_dispatcher_send(hass, SIGNAL_PRICES_UPDATED.format(config_entry.entry_id))
+
+
+def tariff_prices(operador: Comercializador) -> dict[Tarifa, float]:
+    """Unit price of each tariff of the plan."""
+    return {
+        tariff: operador.plano.custo_tarifa(tariff) for tariff in operador.plano.tarifas
+    }
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the price history of a removed config entry."""
+    await prices_store(hass, entry.entry_id).async_remove()
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
@@ -224,4 +576,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
         )
     )
 
+    if unload_ok:
+        hass.data[DOMAIN].pop(entry.entry_id)
+
     return unload_ok
@@ -0,0 +1,94 @@
+"""Battery charge/discharge schedule over the tariff timeline."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from math import ceil, floor, inf
+
+SLOT_HOURS = 0.25
+
+
+@dataclass
+class BatterySlot:
+    """Plan of a quarter-hour, all energies in kWh."""
+
+    charge: float  # drawn from the grid into the battery
+    discharge: float  # delivered by the battery to the load
+    grid: float  # drawn from the grid
+    soc: float  # stored at the end of the slot
+    cost: float
+
+
+def optimize_battery(
+    prices: list[float],
+    load: list[float],
+    capacity: float,
+    max_charge_power: float,
+    max_discharge_power: float,
+    efficiency: float,
+    initial_energy: float,
+    steps: int,
+) -> list[BatterySlot]:
+    """Cheapest schedule for the given price and load (kWh) of each slot.
+
+    Dynamic programming over the stored energy. The cost to go is computed at
+    steps + 1 levels and interpolated in between, so a slot can charge or
+    discharge any amount within its limits, not only whole levels. Charging
+    losses are applied when drawing from the grid and the battery never
+    exports, it only supplies the load.
+    """
+    step = capacity / steps
+    max_charge = max_charge_power * SLOT_HOURS * efficiency  # stored per slot
+    max_discharge = max_discharge_power * SLOT_HOURS
+
+    def cost_to_go(values: list[float], energy: float) -> float:
+        position = min(max(energy / step, 0), steps)
+        level = min(int(position), steps - 1)
+        fraction = position - level
+        return values[level] * (1 - fraction) + values[level + 1] * fraction
+
+    def best_move(
+        price: float, demand: float, energy: float, values: list[float]
+    ) -> tuple[float, float]:
+        # the cost is linear between levels, so the best stored energy at the
+        # end of the slot is a level or one of the limits of the slot
+        low = max(energy - min(max_discharge, demand), 0.0)
+        high = min(energy + max_charge, capacity)
+        targets = [energy, low, high]
+        targets.extend(
+            level * step
+            for level in range(
+                max(ceil(low / step), 0), min(floor(high / step), steps) + 1
+            )
+        )
+
+        best, best_target = inf, energy
+        for target in targets:
+            delta = target - energy
+            grid = demand + delta / efficiency if delta > 0 else demand + delta
+            cost = price * grid + cost_to_go(values, target)
+            if cost < best:
+                best, best_target = cost, target
+        return best, best_target
+
+    # cost to go of each level at the start of each slot, filled backwards
+    values = [[0.0] * (steps + 1)]
+    for price, demand in zip(reversed(prices), reversed(load)):
+        values.append(
+            [
+                best_move(price, demand, level * step, values[-1])[0]
+                for level in range(steps + 1)
+            ]
+        )
+    values.reverse()
+
+    schedule = []
+    energy = min(max(initial_energy, 0.0), capacity)
+    for slot, (price, demand) in enumerate(zip(prices, load)):
+        _, target = best_move(price, demand, energy, values[slot + 1])
+        delta = target - energy
+        charge = delta / efficiency if delta > 0 else 0.0
+        discharge = -delta if delta < 0 else 0.0
+        grid = max(demand + charge - discharge, 0.0)
+        schedule.append(BatterySlot(charge, discharge, grid, target, price * grid))
+        energy = target
+    return schedule
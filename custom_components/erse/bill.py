@@ -0,0 +1,151 @@
+"""Incremental electricity bill breakdown."""
+from __future__ import annotations
+
+from typing import Any
+
+from pyerse.comercializador import (
+    CONTRIB_AUDIOVISUAL,
+    IMPOSTO_ESPECIAL_CONSUMO,
+    IVA_INTERMEDIA,
+    IVA_NORMAL,
+    IVA_REDUZIDA,
+    TAXA_DGEG,
+    Plano,
+    Tarifa,
+)
+
+# kWh of each tariff billed with the intermediate VAT rate in a billing cycle
+# https://www.erse.pt/media/pzievesl/ersexplica_aplicação-do-iva.pdf
+VAT_PLAFOND = {
+    Tarifa.NORMAL: 100,
+    Tarifa.VAZIO: 40,
+    Tarifa.FORA_DE_VAZIO: 60,
+    Tarifa.CHEIAS: 42.9,
+    Tarifa.PONTA: 17.1,
+}
+VAT_PLAFOND_MAX_POWER = 6.9  # kVA
+REDUCED_POWER_VAT_MAX_POWER = 3.45  # kVA
+
+BILL_ENERGY = "energy"
+BILL_POWER = "power"
+BILL_IEC = "iec"
+BILL_AUDIOVISUAL = "audiovisual"
+BILL_DGEG = "dgeg"
+BILL_VAT = "vat"
+BILL_TOTAL = "total"
+BILL_COMPONENTS = [
+    BILL_ENERGY,
+    BILL_POWER,
+    BILL_IEC,
+    BILL_AUDIOVISUAL,
+    BILL_DGEG,
+    BILL_VAT,
+    BILL_TOTAL,
+]
+
+
+class BillEngine:
+    """Running bill of a billing cycle, updated one meter delta at a time.
+
+    Only the totals needed by the bill are kept, so each delta is handled in
+    constant time, including the ones crossing a VAT plafond.
+    """
+
+    def __init__(self, plano: Plano) -> None:
+        """Initialize an empty cycle."""
+        self._plano = plano
+        self._reduced_vat = plano.potencia <= VAT_PLAFOND_MAX_POWER
+        self.cycle_start: str | None = None
+        self.readings: dict[str, float] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        """Start a new billing cycle."""
+        self.kwh: dict[str, float] = {}
+        self.energy_intermediate = 0.0  # energy billed with intermediate VAT
+        self.energy_normal = 0.0  # energy billed with normal VAT
+        self.iec = 0.0
+
+    def add(self, tariff: Tarifa, kwh: float, price: float) -> None:
+        """Add energy consumed in a tariff at a unit price."""
+        used = self.kwh.get(tariff.value, 0)
+        self.kwh[tariff.value] = used + kwh
+
+        below = 0.0
+        if self._reduced_vat:
+            below = min(max(VAT_PLAFOND[tariff] - used, 0), kwh)
+
+        self.energy_intermediate += below * price
+        self.energy_normal += (kwh - below) * price
+        self.iec += kwh * IMPOSTO_ESPECIAL_CONSUMO
+
+    def unit_price(self, tariff: Tarifa, price: float) -> float:
+        """Price (€/kWh) of the next kWh of a tariff with the excise tax and VAT."""
+        vat = IVA_NORMAL
+        if self._reduced_vat and self.kwh.get(tariff.value, 0) < VAT_PLAFOND[tariff]:
+            vat = IVA_INTERMEDIA
+        return price * vat + IMPOSTO_ESPECIAL_CONSUMO * IVA_NORMAL
+
+    def energy_cost(self) -> float:
+        """Energy with the excise tax and VAT (€)."""
+        return (
+            self.energy_intermediate * IVA_INTERMEDIA
+            + (self.energy_normal + self.iec) * IVA_NORMAL
+        )
+
+    def breakdown(self, days: int) -> dict[str, float]:
+        """Bill components (€) after a number of days of the cycle."""
+        power = days * self._plano.custo_potencia()
+        if self._plano.potencia <= REDUCED_POWER_VAT_MAX_POWER:
+            power_vat = power * (IVA_REDUZIDA - 1)
+        else:
+            power_vat = power * (IVA_NORMAL - 1)
+
+        vat = (
+            self.energy_intermediate * (IVA_INTERMEDIA - 1)
+            + (self.energy_normal + self.iec) * (IVA_NORMAL - 1)
+            + power_vat
+            + CONTRIB_AUDIOVISUAL * (IVA_REDUZIDA - 1)
+            + TAXA_DGEG * (IVA_NORMAL - 1)
+        )
+
+        bill = {
+            BILL_ENERGY: self.energy_intermediate + self.energy_normal,
+            BILL_POWER: power,
+            BILL_IEC: self.iec,
+            BILL_AUDIOVISUAL: CONTRIB_AUDIOVISUAL,
+            BILL_DGEG: TAXA_DGEG,
+            BILL_VAT: vat,
+        }
+        bill[BILL_TOTAL] = sum(bill.values())
+        return bill
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the cycle totals in a form that can be stored."""
+        return {
+            "cycle_start": self.cycle_start,
+            "readings": self.readings,
+            "kwh": self.kwh,
+            "energy_intermediate": self.energy_intermediate,
+            "energy_normal": self.energy_normal,
+            "iec": self.iec,
+        }
+
+    def restore(self, restored: dict[str, Any] | None) -> None:
+        """Restore the cycle totals stored by as_dict."""
+        if not restored:
+            return
+        try:
+            self.readings = {
+                meter: float(value) for meter, value in restored["readings"].items()
+            }
+            self.kwh = {
+                tariff: float(value) for tariff, value in restored["kwh"].items()
+            }
+            self.energy_intermediate = float(restored["energy_intermediate"])
+            self.energy_normal = float(restored["energy_normal"])
+            self.iec = float(restored["iec"])
+            self.cycle_start = restored["cycle_start"]
+        except (AttributeError, KeyError, TypeError, ValueError):
+            self.readings = {}
+            self.reset()
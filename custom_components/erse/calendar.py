@@ -0,0 +1,80 @@
+"""Calendar of the tariff periods of an electricity plan."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from homeassistant.components.calendar import CalendarEntity, CalendarEvent
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+from homeassistant.util import slugify
+from pyerse.comercializador import Tarifa
+
+from .const import ATTR_ENTRY_ID, DOMAIN, EVENT_TARIFF_CHANGED
+from .entity import ERSEEntity
+
+# periods are looked up this far around a range so they are not cut at its edges
+PERIOD_MARGIN = timedelta(days=1)
+
+
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Set up the tariff calendar from a Config Entry."""
+    async_add_entities([TariffCalendar(hass, config_entry.entry_id)])
+
+
+class TariffCalendar(ERSEEntity, CalendarEntity):
+    """Tariff periods as calendar events."""
+
+    _attr_translation_key = "tariff_periods"
+
+    def __init__(self, hass, entry_id) -> None:
+        """Initialize the calendar of a plan."""
+        super().__init__(hass.data[DOMAIN][entry_id])
+
+        self._attr_unique_id = slugify(f"{entry_id} calendar")
+        self._entry_id = entry_id
+        self._timeline = self._data.timeline
+
+    async def async_added_to_hass(self):
+        """Update the current event at each tariff change."""
+        await super().async_added_to_hass()
+
+        @callback
+        def async_tariff_changed(event: Event) -> None:
+            if event.data.get(ATTR_ENTRY_ID) == self._entry_id:
+                self.async_write_ha_state()
+
+        self.async_on_remove(
+            self.hass.bus.async_listen(EVENT_TARIFF_CHANGED, async_tariff_changed)
+        )
+
+    def _event(self, start: datetime, end: datetime, tariff: Tarifa) -> CalendarEvent:
+        """Calendar event of a tariff period."""
+        cost = self._operator.plano.custo_tarifa(tariff)
+        return CalendarEvent(
+            start=start,
+            end=end,
+            summary=f"{tariff.value} ({cost} €/kWh)",
+        )
+
+    @property
+    def event(self) -> CalendarEvent | None:
+        """Return the current tariff period."""
+        now = dt_util.now()
+        for start, end, tariff in self._timeline.periods(
+            now - PERIOD_MARGIN, now + PERIOD_MARGIN
+        ):
+            if start <= now < end:
+                return self._event(start, end, tariff)
+        return None
+
+    async def async_get_events(
+        self, hass: HomeAssistant, start_date: datetime, end_date: datetime
+    ) -> list[CalendarEvent]:
+        """Return the tariff periods between two moments."""
+        return [
+            self._event(start, end, tariff)
+            for start, end, tariff in self._timeline.periods(
+                start_date - PERIOD_MARGIN, end_date + PERIOD_MARGIN
+            )
+            if end > start_date and start < end_date
+        ]
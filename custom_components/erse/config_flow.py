@@ -11,16 +11,23 @@ from pyerse.ciclos import Ciclo_Diario
 from pyerse.comercializador import POTENCIA, Comercializador
 
 from .const import (
+    CONF_APPLIANCES,
     CONF_CYCLE,
+    CONF_ENERGY_SENSOR,
+    CONF_FEED_IN_RATE,
     CONF_INSTALLED_POWER,
     CONF_METER_SUFFIX,
     CONF_OPERATOR,
+    CONF_PER_PHASE,
     CONF_PLAN,
     CONF_POWER_COST,
+    CONF_POWER_SENSOR,
     CONF_UTILITY_METERS,
     CONF_EXPORT_METER,
     DOMAIN,
 )
+from .meters import async_entry_meters
+from .preview import CostPreview
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -35,6 +42,11 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
     CONNECTION_CLASS = config_entries.CONN_CLASS_ASSUMED
 
+    def __init__(self):
+        """Initialize config flow."""
+        self.preview = CostPreview()
+        self.previewed = None
+
     @staticmethod
     @callback
     def async_get_options_flow(config_entry):
@@ -99,6 +111,33 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                                 "entity": {
                                     "domain": SENSOR_DOMAIN,
                                     "device_class": "energy",
+                                    "multiple": True,
+                                }
+                            },
+                        ),
+                        vol.Optional(CONF_PER_PHASE, default=False): bool,
+                        vol.Optional(CONF_ENERGY_SENSOR): selector.selector(
+                            {
+                                "entity": {
+                                    "domain": SENSOR_DOMAIN,
+                                    "device_class": "energy",
+                                }
+                            },
+                        ),
+                        vol.Optional(CONF_POWER_SENSOR): selector.selector(
+                            {
+                                "entity": {
+                                    "domain": SENSOR_DOMAIN,
+                                    "device_class": "power",
+                                }
+                            },
+                        ),
+                        vol.Optional(CONF_APPLIANCES): selector.selector(
+                            {
+                                "entity": {
+                                    "domain": SENSOR_DOMAIN,
+                                    "device_class": "energy",
+                                    "multiple": True,
                                 }
                             },
                         ),
@@ -108,55 +147,80 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         if CONF_UTILITY_METERS in user_input:
             self.info[CONF_UTILITY_METERS] = user_input[CONF_UTILITY_METERS]
-        if CONF_EXPORT_METER in user_input:
+        if user_input.get(CONF_EXPORT_METER):
             self.info[CONF_EXPORT_METER] = user_input[CONF_EXPORT_METER]
+            self.info[CONF_PER_PHASE] = user_input[CONF_PER_PHASE]
+        if CONF_ENERGY_SENSOR in user_input:
+            self.info[CONF_ENERGY_SENSOR] = user_input[CONF_ENERGY_SENSOR]
+        if CONF_POWER_SENSOR in user_input:
+            self.info[CONF_POWER_SENSOR] = user_input[CONF_POWER_SENSOR]
+        if CONF_APPLIANCES in user_input:
+            self.info[CONF_APPLIANCES] = user_input[CONF_APPLIANCES]
         return await self.async_step_costs()
 
     async def async_step_costs(self, user_input=None):
-        """Handle the costs of each tariff."""
+        """Handle the costs of each tariff, previewing them until submitted as is."""
         errors = {}
+        preview = "-"
 
-        if user_input is None:
-            DATA_SCHEMA = vol.Schema(
+        if user_input is not None:
+            for tariff in self.operator.plano.tarifas:
+                self.operator.plano.definir_custo_kWh(tariff, user_input[tariff.name])
+            self.operator.plano.definir_custo_potencia(user_input[CONF_POWER_COST])
+
+            if user_input == self.previewed:
+                return self.async_create_entry(
+                    title=str(self.operator), data={**self.info, **user_input}
+                )
+
+            self.previewed = user_input
+            preview = await self.preview.async_text(
+                self.hass,
+                self.operator.plano,
                 {
-                    vol.Required(CONF_POWER_COST): vol.Coerce(float),
-                    **{
-                        vol.Required(tariff.name): vol.Coerce(float)
-                        for tariff in self.operator.plano.tarifas
-                    },
-                    **{
-                        vol.Required(
-                            tariff.name + CONF_METER_SUFFIX
-                        ): selector.selector(
-                            {
-                                "entity": {
-                                    "domain": "sensor",
-                                    "device_class": "energy",
-                                    "integration": "utility_meter",
-                                    "multiple": True,
-                                }
-                            },
-                        )
-                        for tariff in self.operator.plano.tarifas
-                    },
-                }
-            )
-            return self.async_show_form(
-                step_id="costs", data_schema=DATA_SCHEMA, errors=errors
+                    meter: tariff
+                    for tariff in self.operator.plano.tarifas
+                    for meter in user_input.get(tariff.name + CONF_METER_SUFFIX, [])
+                },
             )
 
-        try:
-            for key in user_input:
-                if key == CONF_POWER_COST:
-                    self.operator.plano.definir_custo_potencia(user_input[key])
-                else:
-                    self.operator.plano.definir_custo_kWh(key, user_input[key])
-        except Exception:
-            # TODO do something about it
-            pass
-
-        return self.async_create_entry(
-            title=str(self.operator), data={**self.info, **user_input}
+        # the raw energy sensor is metered by tariff by the integration itself,
+        # the utility_meter sensors are then only used to preview the costs
+        meter_key = vol.Optional if CONF_ENERGY_SENSOR in self.info else vol.Required
+        DATA_SCHEMA = vol.Schema(
+            {
+                vol.Required(CONF_POWER_COST): vol.Coerce(float),
+                **{
+                    vol.Required(tariff.name): vol.Coerce(float)
+                    for tariff in self.operator.plano.tarifas
+                },
+                **(
+                    {vol.Optional(CONF_FEED_IN_RATE, default=0): vol.Coerce(float)}
+                    if CONF_EXPORT_METER in self.info
+                    else {}
+                ),
+                **{
+                    meter_key(tariff.name + CONF_METER_SUFFIX): selector.selector(
+                        {
+                            "entity": {
+                                "domain": "sensor",
+                                "device_class": "energy",
+                                "integration": "utility_meter",
+                                "multiple": True,
+                            }
+                        },
+                    )
+                    for tariff in self.operator.plano.tarifas
+                },
+            }
+        )
+        if user_input is not None:
+            DATA_SCHEMA = self.add_suggested_values_to_schema(DATA_SCHEMA, user_input)
+        return self.async_show_form(
+            step_id="costs",
+            data_schema=DATA_SCHEMA,
+            errors=errors,
+            description_placeholders={"preview": preview},
         )
 
 
@@ -183,25 +247,73 @@ class ERSEOptionsFlow(config_entries.OptionsFlow):
                 for tariff in self.operator.plano.tarifas
             },
         }
+        if CONF_EXPORT_METER in config_entry.data:
+            self.costs[CONF_FEED_IN_RATE] = config_entry.options.get(
+                CONF_FEED_IN_RATE, config_entry.data.get(CONF_FEED_IN_RATE, 0)
+            )
+        self.appliances = config_entry.options.get(
+            CONF_APPLIANCES, config_entry.data.get(CONF_APPLIANCES, [])
+        )
+        self.entry = config_entry
+        self.preview = CostPreview()
+        self.previewed = None
 
     async def async_step_init(self, user_input=None):
-        """Manage the options."""
+        """Manage the options, previewing the costs until submitted unchanged."""
+        preview = "-"
+
         if user_input is not None:
-            return self.async_create_entry(title="", data=user_input)
+            if user_input == self.previewed:
+                return self.async_create_entry(title="", data=user_input)
 
-        return self.async_show_form(
-            step_id="init",
-            data_schema=vol.Schema(
-                {
+            self.previewed = user_input
+            for tariff in self.operator.plano.tarifas:
+                self.operator.plano.definir_custo_kWh(tariff, user_input[tariff.name])
+            self.operator.plano.definir_custo_potencia(user_input[CONF_POWER_COST])
+            preview = await self.preview.async_text(
+                self.hass,
+                self.operator.plano,
+                async_entry_meters(self.hass, self.entry, self.operator.plano.tarifas),
+            )
+
+        data_schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_POWER_COST, default=self.costs[CONF_POWER_COST]
+                ): vol.Coerce(float),
+                **{
                     vol.Required(
-                        CONF_POWER_COST, default=self.costs[CONF_POWER_COST]
-                    ): vol.Coerce(float),
-                    **{
-                        vol.Required(
-                            tariff.name, default=self.costs[tariff.name]
+                        tariff.name, default=self.costs[tariff.name]
+                    ): vol.Coerce(float)
+                    for tariff in self.operator.plano.tarifas
+                },
+                **(
+                    {
+                        vol.Optional(
+                            CONF_FEED_IN_RATE,
+                            default=self.costs[CONF_FEED_IN_RATE],
                         ): vol.Coerce(float)
-                        for tariff in self.operator.plano.tarifas
+                    }
+                    if CONF_FEED_IN_RATE in self.costs
+                    else {}
+                ),
+                vol.Optional(
+                    CONF_APPLIANCES, default=self.appliances
+                ): selector.selector(
+                    {
+                        "entity": {
+                            "domain": SENSOR_DOMAIN,
+                            "device_class": "energy",
+                            "multiple": True,
+                        }
                     },
-                }
-            ),
+                ),
+            }
+        )
+        if user_input is not None:
+            data_schema = self.add_suggested_values_to_schema(data_schema, user_input)
+        return self.async_show_form(
+            step_id="init",
+            data_schema=data_schema,
+            description_placeholders={"preview": preview},
         )
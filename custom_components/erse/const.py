@@ -8,10 +8,15 @@ CONF_PLAN = "plan"
 CONF_CYCLE = "cycle"
 
 CONF_EXPORT_METER = "export_meter"
+CONF_PER_PHASE = "per_phase"
+CONF_APPLIANCES = "appliances"
+CONF_ENERGY_SENSOR = "energy_sensor"
+CONF_POWER_SENSOR = "power_sensor"
 
 CONF_METER_SUFFIX = " meter"
 CONF_METER = "meter"
 CONF_POWER_COST = "power_cost"
+CONF_FEED_IN_RATE = "feed_in_rate"
 CONF_UTILITY_METER = "utility_meter"
 CONF_UTILITY_METERS = "utility_meter"
 CONF_PONTA = "ponta"
@@ -20,13 +25,49 @@ CONF_VAZIO = "vazio"
 CONF_FORA_DE_VAZIO = "fora_de_vazio"
 CONF_NORMAL = "normal"
 
+CONF_MATRIX = "matrix"
+
+CONF_START = "start"
+CONF_END = "end"
+CONF_FILENAME = "filename"
+CONF_FORMAT = "format"
+
+CONF_CAPACITY = "capacity"
+CONF_MAX_CHARGE_POWER = "max_charge_power"
+CONF_MAX_DISCHARGE_POWER = "max_discharge_power"
+CONF_EFFICIENCY = "efficiency"
+CONF_STATE_OF_CHARGE = "state_of_charge"
+CONF_LOAD = "load"
+CONF_HOURS = "hours"
+
 UPDATE_LISTENER = "update_listener"
 
+EVENT_TARIFF_CHANGED = f"{DOMAIN}_tariff_changed"
+SIGNAL_COST_UPDATED = f"{DOMAIN}_cost_updated_{{}}"
+SIGNAL_PRICES_UPDATED = f"{DOMAIN}_prices_updated_{{}}"
+
 ATTR_POWER_COST = "daily_power_cost"
 ATTR_COST = "unitary_cost"
 ATTR_CURRENT_COST = "current_unitary_cost"
 ATTR_TARIFFS = "tariffs"
 ATTR_UTILITY_METERS = "utility meters"
+ATTR_SWITCH_SKEW = "switch_skew"
+ATTR_MAX_DEMAND = "max_demand"
+ATTR_MAX_DEMAND_DATETIME = "max_demand_datetime"
+ATTR_SINCE = "since"
+ATTR_PREVIOUS_TARIFF = "previous_tariff"
+ATTR_TARIFF = "tariff"
+ATTR_BOUNDARY = "boundary"
+ATTR_NEXT_TARIFF = "next_tariff"
+ATTR_NEXT_TRANSITION = "next_transition"
+ATTR_ENTRY_ID = "entry_id"
 
 COST_PRECISION = 2
 ENERGY_PRECISION = 3
+
+SIMUL_MAX_PARALLEL = 4
+
+APPLIANCE_FLUSH_INTERVAL = 5  # seconds
+SUBSCRIBE_MIN_INTERVAL = 1  # seconds
+NET_HISTORY_SIZE = 96  # quarter-hours
+BATTERY_SOC_STEPS = 50
@@ -0,0 +1,69 @@
+"""Billing cycle of the tariff meters."""
+from __future__ import annotations
+
+from homeassistant.components.sensor import ATTR_LAST_RESET
+from homeassistant.core import HomeAssistant, State
+from homeassistant.util import dt as dt_util
+from pyerse.comercializador import Tarifa
+
+ATTR_METER_PERIOD = "meter_period"
+
+# periods of a utility_meter, shortest first
+METER_PERIODS = [
+    "quarter-hourly",
+    "hourly",
+    "daily",
+    "weekly",
+    "monthly",
+    "bimonthly",
+    "quarterly",
+    "yearly",
+]
+
+
+def cycle_length(state: State | None) -> tuple[int, int] | None:
+    """Sort key of the cycle of a meter, greater for longer cycles.
+
+    The period of a utility_meter is used when it has one, otherwise the
+    older the day of the last reset, the longer the cycle. None if unknown.
+    """
+    if state is None:
+        return None
+    if (period := state.attributes.get(ATTR_METER_PERIOD)) in METER_PERIODS:
+        return METER_PERIODS.index(period), 0
+    if (last_reset := state.attributes.get(ATTR_LAST_RESET)) is not None and (
+        reset := dt_util.parse_datetime(str(last_reset))
+    ) is not None:
+        return -1, -dt_util.as_local(reset).date().toordinal()
+    return None
+
+
+def cycle_meters(hass: HomeAssistant, meters: dict[str, Tarifa]) -> dict[str, Tarifa]:
+    """Meters of each tariff with the longest cycle, the ones a bill adds up.
+
+    A tariff read by e.g. a daily and a monthly meter would otherwise be
+    counted twice, while the meters of each phase share their cycle and are
+    all kept. The meters of a tariff whose cycles are unknown are all kept.
+    """
+    lengths = {meter: cycle_length(hass.states.get(meter)) for meter in meters}
+    longest: dict[Tarifa, tuple[int, int]] = {}
+    for meter, tariff in meters.items():
+        if (length := lengths[meter]) is not None and (
+            tariff not in longest or length > longest[tariff]
+        ):
+            longest[tariff] = length
+    return {
+        meter: tariff
+        for meter, tariff in meters.items()
+        if lengths[meter] == longest.get(tariff)
+    }
+
+
+def last_cycle_start(hass: HomeAssistant, meters: dict[str, Tarifa]) -> str | None:
+    """Last reset of the meters with the longest cycle, None if unknown."""
+    for meter in cycle_meters(hass, meters):
+        if (state := hass.states.get(meter)) is not None and (
+            last_reset := state.attributes.get(ATTR_LAST_RESET)
+        ) is not None:
+            return str(last_reset)
+    return None
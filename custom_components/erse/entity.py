@@ -4,9 +4,9 @@ from __future__ import annotations
 from homeassistant.components.sensor import SensorStateClass, SensorDeviceClass
 from homeassistant.const import CURRENCY_EURO
 from homeassistant.helpers.entity import Entity, DeviceInfo
-from pyerse.comercializador import Comercializador
 
 from .const import COST_PRECISION, DOMAIN
+from .models import ERSEData
 
 
 class ERSEEntity(Entity):
@@ -17,11 +17,12 @@ class ERSEEntity(Entity):
 
     def __init__(
         self,
-        operator: Comercializador,
+        data: ERSEData,
     ) -> None:
         """Init the ERSE base entity."""
         super().__init__()
-        self._operator = operator
+        self._data = data
+        self._operator = data.operator
 
     @property
     def device_info(self) -> DeviceInfo:
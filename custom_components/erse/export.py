@@ -0,0 +1,137 @@
+"""Export of consumption and costs from recorder long-term statistics."""
+from __future__ import annotations
+
+import csv
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta
+from itertools import islice
+
+from homeassistant.components.recorder.statistics import statistics_during_period
+from homeassistant.const import UnitOfEnergy
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+from pyerse.comercializador import Tarifa
+
+from .prices import PriceHistory
+
+EXPORT_CHUNK = timedelta(days=7)
+EXPORT_BATCH_ROWS = 10000
+
+FORMAT_CSV = "csv"
+FORMAT_PARQUET = "parquet"
+EXPORT_FORMATS = [FORMAT_CSV, FORMAT_PARQUET]
+
+COLUMNS = ("start", "meter", "tariff", "energy", "unit_price", "cost")
+
+
+def statistic_rows(
+    hass: HomeAssistant,
+    start: datetime,
+    end: datetime,
+    meters: dict[str, Tarifa],
+) -> Iterator[tuple[datetime, str, Tarifa, float]]:
+    """Hourly consumption of each meter, read from the recorder a chunk at a time."""
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + EXPORT_CHUNK, end)
+        stats = statistics_during_period(
+            hass,
+            chunk_start,
+            chunk_end,
+            set(meters),
+            "hour",
+            {"energy": UnitOfEnergy.KILO_WATT_HOUR},
+            {"change"},
+        )
+        chunk = [
+            (row["start"], meter, row.get("change"))
+            for meter, rows in stats.items()
+            for row in rows
+        ]
+        chunk.sort(key=lambda row: (row[0], row[1]))
+        for interval_start, meter, change in chunk:
+            if change is None:
+                continue
+            if not isinstance(interval_start, datetime):
+                interval_start = dt_util.utc_from_timestamp(interval_start)
+            yield interval_start, meter, meters[meter], change
+        chunk_start = chunk_end
+
+
+def priced_rows(
+    rows: Iterable[tuple[datetime, str, Tarifa, float]],
+    prices: PriceHistory,
+) -> Iterator[tuple[str, str, str, float, float, float]]:
+    """Add the unit price in force and cost of each interval."""
+    for interval_start, meter, tariff, energy in rows:
+        price = prices.price(tariff, interval_start)
+        yield (
+            dt_util.as_local(interval_start).isoformat(),
+            meter,
+            tariff.value,
+            energy,
+            price,
+            energy * price,
+        )
+
+
+def write_csv(path: str, rows: Iterable[tuple]) -> int:
+    """Write rows to a CSV file, return the number of rows written."""
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(COLUMNS)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_parquet(path: str, rows: Iterable[tuple]) -> int:
+    """Write rows to a Parquet file in batches, return the number of rows written."""
+    try:
+        import pyarrow as pa  # pylint: disable=import-outside-toplevel
+        import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+    except ImportError as err:
+        raise HomeAssistantError("Parquet export requires pyarrow") from err
+
+    schema = pa.schema(
+        [
+            ("start", pa.string()),
+            ("meter", pa.string()),
+            ("tariff", pa.string()),
+            ("energy", pa.float64()),
+            ("unit_price", pa.float64()),
+            ("cost", pa.float64()),
+        ]
+    )
+
+    count = 0
+    rows = iter(rows)
+    with pq.ParquetWriter(path, schema) as writer:
+        while batch := list(islice(rows, EXPORT_BATCH_ROWS)):
+            writer.write_table(
+                pa.Table.from_arrays(
+                    [pa.array(column) for column in zip(*batch)], schema=schema
+                )
+            )
+            count += len(batch)
+    return count
+
+
+def export_statistics(
+    hass: HomeAssistant,
+    path: str,
+    export_format: str,
+    start: datetime,
+    end: datetime,
+    meters: dict[str, Tarifa],
+    prices: PriceHistory,
+) -> int:
+    """Stream consumption, tariff, unit price and cost of each interval to a file."""
+    rows = priced_rows(statistic_rows(hass, start, end, meters), prices)
+
+    if export_format == FORMAT_PARQUET:
+        return write_parquet(path, rows)
+    return write_csv(path, rows)
@@ -0,0 +1,74 @@
+"""Compact live view of the costs of a config entry."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, callback
+
+from .const import COST_PRECISION
+
+FEED_TARIFF = ("tariff",)
+FEED_TOTAL = ("total",)
+FEED_COST = "cost"
+FEED_NET = "net"
+
+FeedKey = tuple[str, ...]
+
+
+def encode(values: dict[FeedKey, Any]) -> dict[str, Any]:
+    """Nest flat feed keys, e.g. {("cost", "Vazio"): 1} -> {"cost": {"Vazio": 1}}."""
+    encoded: dict[str, Any] = {}
+    for key, value in values.items():
+        node = encoded
+        for part in key[:-1]:
+            node = node.setdefault(part, {})
+        node[key[-1]] = value
+    return encoded
+
+
+class CostFeed:
+    """Latest tariff, per tariff cost, total and net balance of an entry.
+
+    Entities publish here when they compute a new value and subscribers are
+    only told about the keys whose value actually changed.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty feed."""
+        self._values: dict[FeedKey, Any] = {}
+        self._parts: dict[FeedKey, dict[str, float]] = {}
+        self._listeners: list[Callable[[FeedKey, Any], None]] = []
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return all the current values."""
+        return encode(self._values)
+
+    @callback
+    def async_set(self, key: FeedKey, value: Any) -> None:
+        """Publish a value."""
+        if self._values.get(key) == value:
+            return
+        self._values[key] = value
+        for listener in self._listeners:
+            listener(key, value)
+
+    @callback
+    def async_set_part(self, key: FeedKey, part: str, value: float) -> None:
+        """Publish one of the values summed into a key (e.g. a meter of a tariff)."""
+        parts = self._parts.setdefault(key, {})
+        parts[part] = value
+        self.async_set(key, round(sum(parts.values()), COST_PRECISION))
+
+    @callback
+    def async_subscribe(
+        self, listener: Callable[[FeedKey, Any], None]
+    ) -> CALLBACK_TYPE:
+        """Call listener with each changed key and value."""
+        self._listeners.append(listener)
+
+        @callback
+        def async_unsubscribe() -> None:
+            self._listeners.remove(listener)
+
+        return async_unsubscribe
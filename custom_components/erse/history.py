@@ -0,0 +1,73 @@
+"""Fixed-size history of net metering intervals."""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterator
+from datetime import datetime
+from math import isnan, nan
+from typing import Any
+
+from homeassistant.util import dt as dt_util
+
+# end timestamp, import, export, net
+FIELDS = 4
+
+
+class IntervalHistory:
+    """Ring buffer of the last interval balances, stored in a flat array of floats."""
+
+    def __init__(self, size: int) -> None:
+        """Preallocate the buffer."""
+        self._size = size
+        self._values = array("d", [nan]) * (size * FIELDS)
+        self._next = 0
+
+    def append(self, end: datetime, period_import: float, period_export: float) -> None:
+        """Record an interval, overwriting the oldest one when full."""
+        offset = self._next * FIELDS
+        self._values[offset] = end.timestamp()
+        self._values[offset + 1] = period_import
+        self._values[offset + 2] = period_export
+        self._values[offset + 3] = period_import - period_export
+        self._next = (self._next + 1) % self._size
+
+    def __iter__(self) -> Iterator[tuple[datetime, float, float, float]]:
+        """Iterate the recorded intervals, oldest first."""
+        for index in range(self._size):
+            offset = (self._next + index) % self._size * FIELDS
+            if isnan(self._values[offset]):
+                continue
+            yield (
+                dt_util.utc_from_timestamp(self._values[offset]),
+                self._values[offset + 1],
+                self._values[offset + 2],
+                self._values[offset + 3],
+            )
+
+    def as_list(self) -> list[dict[str, Any]]:
+        """Return the recorded intervals, oldest first."""
+        return [
+            {"end": end.isoformat(), "import": imp, "export": exp, "net": net}
+            for end, imp, exp, net in self
+        ]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the buffer in a form that can be stored."""
+        return {
+            "next": self._next,
+            "values": [None if isnan(value) else value for value in self._values],
+        }
+
+    def restore(self, restored: dict[str, Any] | None) -> None:
+        """Restore the buffer stored by as_dict, if it has the same size."""
+        values = (restored or {}).get("values")
+        if not values or len(values) != len(self._values):
+            return
+        try:
+            self._values = array(
+                "d", [nan if value is None else float(value) for value in values]
+            )
+            self._next = int(restored["next"]) % self._size
+        except (KeyError, TypeError, ValueError):
+            self._values = array("d", [nan]) * (self._size * FIELDS)
+            self._next = 0
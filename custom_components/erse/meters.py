@@ -0,0 +1,45 @@
+"""Tariff meters of a config entry."""
+from __future__ import annotations
+
+from homeassistant.components.sensor import DOMAIN as SENSOR_DOMAIN
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import slugify
+from pyerse.comercializador import Tarifa
+
+from .const import CONF_ENERGY_SENSOR, CONF_METER_SUFFIX, DOMAIN
+
+
+def tariff_energy_unique_id(entry_id: str, tariff: Tarifa) -> str:
+    """Unique id of the energy of a tariff metered from the raw energy sensor."""
+    return slugify(f"{entry_id} {tariff} energy")
+
+
+@callback
+def async_entry_meters(
+    hass: HomeAssistant, entry: ConfigEntry, tariffs: list[Tarifa]
+) -> dict[str, Tarifa]:
+    """Sensors reading the energy of each tariff of an entry.
+
+    With a raw energy sensor these are the tariff energy sensors metered from
+    it, once registered, otherwise the utility_meter sensors of each tariff.
+    """
+    if CONF_ENERGY_SENSOR not in entry.data:
+        return {
+            meter: tariff
+            for tariff in tariffs
+            for meter in entry.data.get(f"{tariff.name}{CONF_METER_SUFFIX}", [])
+        }
+
+    registry = er.async_get(hass)
+    return {
+        entity_id: tariff
+        for tariff in tariffs
+        if (
+            entity_id := registry.async_get_entity_id(
+                SENSOR_DOMAIN, DOMAIN, tariff_energy_unique_id(entry.entry_id, tariff)
+            )
+        )
+        is not None
+    }
@@ -0,0 +1,22 @@
+"""Runtime data of the Entidade Reguladora dos Serviços Energéticos integration."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from pyerse.comercializador import Comercializador
+
+from .feed import CostFeed
+from .prices import PriceHistory
+from .timeline import TariffTimeline
+
+
+@dataclass
+class ERSEData:
+    """Objects shared by all entities of a config entry."""
+
+    operator: Comercializador
+    timeline: TariffTimeline
+    appliances: list[str] = field(default_factory=list)
+    feed: CostFeed = field(default_factory=CostFeed)
+    feed_in_rate: float = 0.0
+    prices: PriceHistory = field(default_factory=PriceHistory)
@@ -0,0 +1,46 @@
+"""Net metering of many import and export meters."""
+from __future__ import annotations
+
+from array import array
+from math import isnan
+
+
+def interval_deltas(readings: array, last: array) -> array:
+    """Energy read by each meter since the last readings, in one pass.
+
+    Meters without a reading keep their last one and meters without a last
+    reading start from the current one, both with no energy in the interval.
+    readings is updated in place to become the next last readings.
+    """
+    deltas = array("d", [0.0]) * len(readings)
+    for index, (reading, previous) in enumerate(zip(readings, last)):
+        if isnan(reading):
+            readings[index] = previous
+        elif not isnan(previous):
+            delta = reading - previous
+            deltas[index] = reading if delta < 0 else delta  # meter reset
+    return deltas
+
+
+def net_balance(
+    imports: array, exports: array, per_phase: bool
+) -> tuple[float, float, float, float]:
+    """Import, export, net import billed and net export (surplus) of an interval.
+
+    Phases are netted one by one (imports and exports in the same order) or
+    all together, in which case the export of one phase offsets the import of
+    another.
+    """
+    period_import = sum(imports)
+    period_export = sum(exports)
+    if per_phase:
+        net = surplus = 0.0
+        for phase_import, phase_export in zip(imports, exports):
+            if phase_import > phase_export:
+                net += phase_import - phase_export
+            else:
+                surplus += phase_export - phase_import
+    else:
+        net = max(period_import - period_export, 0.0)
+        surplus = max(period_export - period_import, 0.0)
+    return period_import, period_export, net, surplus
@@ -0,0 +1,80 @@
+"""Estimated cost of recent consumption under a set of prices."""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pyerse.comercializador import Plano, Tarifa
+
+from .bill import BILL_TOTAL, BillEngine
+from .const import COST_PRECISION
+from .cycle import cycle_meters
+from .export import statistic_rows
+
+_LOGGER = logging.getLogger(__name__)
+
+PREVIEW_DAYS = 30
+
+
+def tariff_energy(
+    hass: HomeAssistant, start: datetime, end: datetime, meters: dict[str, Tarifa]
+) -> dict[Tarifa, float]:
+    """Energy (kWh) read by the meters of each tariff."""
+    energy: dict[Tarifa, float] = {}
+    for _, _, tariff, change in statistic_rows(hass, start, end, meters):
+        energy[tariff] = energy.get(tariff, 0) + change
+    return energy
+
+
+async def async_recent_energy(
+    hass: HomeAssistant, meters: dict[str, Tarifa]
+) -> dict[Tarifa, float] | None:
+    """Energy of each tariff in the last days, None if the recorder can't tell.
+
+    Like the bill, only the meters of each tariff with the longest cycle are
+    added up.
+    """
+    if "recorder" not in hass.config.components or not meters:
+        return None
+
+    meters = cycle_meters(hass, meters)
+
+    end = dt_util.utcnow()
+    try:
+        return await get_instance(hass).async_add_executor_job(
+            tariff_energy, hass, end - timedelta(days=PREVIEW_DAYS), end, meters
+        )
+    except Exception as err:  # pylint: disable=broad-except
+        _LOGGER.warning("Could not read the statistics of %s: %s", list(meters), err)
+        return None
+
+
+def estimate_cost(plano: Plano, energy: dict[Tarifa, float]) -> float:
+    """Bill of the energy at the prices of a plan, over PREVIEW_DAYS."""
+    bill = BillEngine(plano)
+    for tariff, kwh in energy.items():
+        bill.add(tariff, kwh, plano.custo_tarifa(tariff))
+    return bill.breakdown(PREVIEW_DAYS)[BILL_TOTAL]
+
+
+class CostPreview:
+    """Cost preview of a flow, reading the statistics once per set of meters."""
+
+    def __init__(self) -> None:
+        """Initialize an empty preview."""
+        self._meters: dict[str, Tarifa] | None = None
+        self._energy: dict[Tarifa, float] | None = None
+
+    async def async_text(
+        self, hass: HomeAssistant, plano: Plano, meters: dict[str, Tarifa]
+    ) -> str:
+        """Estimated cost at the prices of the plan, as shown in the form."""
+        if meters != self._meters:
+            self._meters = meters
+            self._energy = await async_recent_energy(hass, meters)
+        if self._energy is None:
+            return "-"
+        return f"{round(estimate_cost(plano, self._energy), COST_PRECISION)} €"
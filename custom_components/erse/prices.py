@@ -0,0 +1,101 @@
+"""Effective-dated unit prices of the tariffs of a plan."""
+from __future__ import annotations
+
+from bisect import bisect_right
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+from pyerse.comercializador import Tarifa
+
+from .const import DOMAIN
+
+STORAGE_VERSION = 1
+
+
+def prices_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Store of the price history of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.prices")
+
+
+class PriceHistory:
+    """Versions of the unit prices, each in force from a moment on.
+
+    Versions are kept in start order, so the prices in force at a moment are
+    found with a binary search.
+    """
+
+    def __init__(self, store: Store | None = None) -> None:
+        """Initialize an empty history."""
+        self._store = store
+        self._since: list[float] = []
+        self._prices: list[dict[str, float]] = []
+
+    def price(self, tariff: Tarifa, when: datetime) -> float:
+        """Unit price of a tariff in force at a moment.
+
+        Moments before the first version get the first prices known.
+        """
+        if not self._prices:
+            return 0
+        index = max(bisect_right(self._since, when.timestamp()) - 1, 0)
+        return self._prices[index].get(tariff.value, 0)
+
+    def add(self, since: datetime, prices: dict[Tarifa, float]) -> bool:
+        """Add the prices in force from a moment on, True if they changed."""
+        values = {tariff.value: price for tariff, price in prices.items()}
+        if self._prices and self._prices[-1] == values:
+            return False
+
+        timestamp = since.timestamp()
+        if self._since and timestamp <= self._since[-1]:
+            # a newer version can't start before the last one, it replaces it
+            self._prices[-1] = values
+        else:
+            self._since.append(timestamp)
+            self._prices.append(values)
+        return True
+
+    async def async_load(self) -> None:
+        """Load the versions saved in the store."""
+        if self._store is not None:
+            self.restore(await self._store.async_load())
+
+    async def async_add(self, since: datetime, prices: dict[Tarifa, float]) -> None:
+        """Add the prices in force from a moment on and save them."""
+        if self.add(since, prices) and self._store is not None:
+            await self._store.async_save(self.as_dict())
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the versions in a form that can be stored."""
+        return {
+            "versions": [
+                {
+                    "since": dt_util.utc_from_timestamp(since).isoformat(),
+                    "prices": prices,
+                }
+                for since, prices in zip(self._since, self._prices)
+            ]
+        }
+
+    def restore(self, restored: dict[str, Any] | None) -> None:
+        """Restore the versions stored by as_dict."""
+        if not restored:
+            return
+        try:
+            versions = sorted(
+                (
+                    dt_util.parse_datetime(version["since"]).timestamp(),
+                    {
+                        tariff: float(price)
+                        for tariff, price in version["prices"].items()
+                    },
+                )
+                for version in restored["versions"]
+            )
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return
+        self._since = [since for since, _ in versions]
+        self._prices = [prices for _, prices in versions]
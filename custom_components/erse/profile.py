@@ -0,0 +1,85 @@
+"""Hour-of-week profile of consumption and cost by tariff."""
+from __future__ import annotations
+
+from array import array
+from datetime import datetime
+from typing import Any
+
+from homeassistant.util import dt as dt_util
+from pyerse.comercializador import Tarifa
+
+HOURS_PER_WEEK = 168
+
+
+class WeekProfile:
+    """Energy and cost of each tariff by hour of the week (Monday 00h first).
+
+    Each tariff has its own run of 168 bins in two flat arrays of floats, so a
+    meter delta is added in constant time.
+    """
+
+    def __init__(self, tariffs: list[Tarifa]) -> None:
+        """Initialize an empty profile of the tariffs of a plan."""
+        self._offsets = {
+            tariff: index * HOURS_PER_WEEK for index, tariff in enumerate(tariffs)
+        }
+        self.since: datetime | None = None
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear all the bins."""
+        size = len(self._offsets) * HOURS_PER_WEEK
+        self._kwh = array("d", [0.0]) * size
+        self._cost = array("d", [0.0]) * size
+        self.total_kwh = 0.0
+
+    def add(self, when: datetime, tariff: Tarifa, kwh: float, cost: float) -> None:
+        """Add energy consumed in a tariff at a moment (local wall clock)."""
+        if (offset := self._offsets.get(tariff)) is None:
+            return
+        if self.since is None:
+            self.since = when
+        when = dt_util.as_local(when)
+        index = offset + when.weekday() * 24 + when.hour
+        self._kwh[index] += kwh
+        self._cost[index] += cost
+        self.total_kwh += kwh
+
+    def as_response(self) -> dict[str, Any]:
+        """Return the bins of each tariff."""
+        return {
+            "since": self.since.isoformat() if self.since else None,
+            "tariffs": {
+                tariff.value: {
+                    "energy": self._kwh[offset : offset + HOURS_PER_WEEK].tolist(),
+                    "cost": self._cost[offset : offset + HOURS_PER_WEEK].tolist(),
+                }
+                for tariff, offset in self._offsets.items()
+            },
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the profile in a form that can be stored."""
+        return {
+            "since": self.since.isoformat() if self.since else None,
+            "tariffs": [tariff.value for tariff in self._offsets],
+            "kwh": self._kwh.tolist(),
+            "cost": self._cost.tolist(),
+        }
+
+    def restore(self, restored: dict[str, Any] | None) -> None:
+        """Restore the profile stored by as_dict, if it has the same tariffs."""
+        if not restored or restored.get("tariffs") != [
+            tariff.value for tariff in self._offsets
+        ]:
+            return
+        try:
+            kwh = array("d", [float(value) for value in restored["kwh"]])
+            cost = array("d", [float(value) for value in restored["cost"]])
+            since = dt_util.parse_datetime(restored["since"] or "")
+        except (KeyError, TypeError, ValueError):
+            return
+        if len(kwh) != len(self._kwh) or len(cost) != len(self._cost):
+            return
+        self._kwh, self._cost, self.since = kwh, cost, since
+        self.total_kwh = sum(kwh)
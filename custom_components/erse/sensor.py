@@ -7,8 +7,12 @@ at http://github.com/dgomes/home-assistant-custom-components/electricity/
 
 from __future__ import annotations
 
+import asyncio
 import logging
+from abc import abstractmethod
+from array import array
 from datetime import datetime, timedelta
+from math import isnan, nan
 from typing import Any, Final, Self
 from dataclasses import dataclass
 from homeassistant.helpers import issue_registry as ir
@@ -19,20 +23,37 @@ from homeassistant.const import (
     ATTR_ENTITY_ID,
     ATTR_OPTION,
     ATTR_UNIT_OF_MEASUREMENT,
-    EVENT_HOMEASSISTANT_START,
+    CURRENCY_EURO,
     SERVICE_SELECT_OPTION,
     STATE_UNAVAILABLE,
     STATE_UNKNOWN,
     UnitOfEnergy,
+    UnitOfPower,
+)
+from homeassistant.core import (
+    CALLBACK_TYPE,
+    Event,
+    ServiceResponse,
+    State,
+    SupportsResponse,
+    callback,
+)
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import entity_platform
+from homeassistant.helpers.dispatcher import (
+    async_dispatcher_connect,
+    async_dispatcher_send,
 )
-from homeassistant.core import callback
 from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.event import (
+    async_call_later,
     async_track_state_change_event,
     async_track_time_change,
 )
+from homeassistant.helpers.start import async_at_start
 from homeassistant.util import dt as dt_util
 from homeassistant.util import slugify
+from pyerse.comercializador import Tarifa
 from homeassistant.components.sensor import (
     PLATFORM_SCHEMA,
     RestoreSensor,
@@ -42,19 +63,43 @@ from homeassistant.components.sensor import (
 )
 
 from .const import (
+    APPLIANCE_FLUSH_INTERVAL,
     ATTR_COST,
     ATTR_CURRENT_COST,
+    ATTR_ENTRY_ID,
+    ATTR_MAX_DEMAND,
+    ATTR_MAX_DEMAND_DATETIME,
+    ATTR_NEXT_TARIFF,
+    ATTR_NEXT_TRANSITION,
     ATTR_POWER_COST,
+    ATTR_SINCE,
+    ATTR_SWITCH_SKEW,
+    ATTR_TARIFF,
     ATTR_TARIFFS,
     ATTR_UTILITY_METERS,
+    CONF_ENERGY_SENSOR,
     CONF_METER_SUFFIX,
     CONF_EXPORT_METER,
+    CONF_PER_PHASE,
+    CONF_POWER_SENSOR,
     CONF_UTILITY_METERS,
     COST_PRECISION,
     ENERGY_PRECISION,
     DOMAIN,
+    EVENT_TARIFF_CHANGED,
+    NET_HISTORY_SIZE,
+    SIGNAL_COST_UPDATED,
+    SIGNAL_PRICES_UPDATED,
 )
+from .bill import BILL_COMPONENTS, BillEngine
+from .cycle import cycle_meters, last_cycle_start
 from .entity import ERSEEntity, ERSEMoneyEntity
+from .feed import FEED_COST, FEED_NET, FEED_TOTAL
+from .history import IntervalHistory
+from .meters import tariff_energy_unique_id
+from .models import ERSEData
+from .netmeter import interval_deltas, net_balance
+from .profile import WeekProfile
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -66,60 +111,152 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 
     entities = []
 
-    if CONF_UTILITY_METERS in config_entry.data:
+    # the raw energy sensor is split by tariff here, no utility_meter to drive
+    energy_sensor = config_entry.data.get(CONF_ENERGY_SENSOR)
+
+    if CONF_UTILITY_METERS in config_entry.data and energy_sensor is None:
         entities.append(
             EletricityEntity(
                 hass, config_entry.entry_id, config_entry.data[CONF_UTILITY_METERS]
             )
         )
 
-    meter_entity = None
-    for tariff in hass.data[DOMAIN][config_entry.entry_id].plano.tarifas:
-        for meter_entity in config_entry.data[f"{tariff.name}{CONF_METER_SUFFIX}"]:
+    meters = {}
+    if energy_sensor is None:
+        meters = {
+            meter: tariff
+            for tariff in hass.data[DOMAIN][
+                config_entry.entry_id
+            ].operator.plano.tarifas
+            for meter in config_entry.data.get(f"{tariff.name}{CONF_METER_SUFFIX}", [])
+        }
+
+    meter_entity = energy_sensor
+    for meter_entity, tariff in meters.items():
+        entities.append(TariffCost(hass, config_entry.entry_id, tariff, meter_entity))
+
+    bill = BillTracker(hass, hass.data[DOMAIN][config_entry.entry_id], meters)
+
+    tariff_meter = None
+    if energy_sensor is not None:
+        tariff_meter = TariffMeterTracker(
+            hass, hass.data[DOMAIN][config_entry.entry_id], energy_sensor, bill
+        )
+        config_entry.async_on_unload(tariff_meter.async_start())
+        for tariff in hass.data[DOMAIN][config_entry.entry_id].operator.plano.tarifas:
             entities.append(
-                TariffCost(hass, config_entry.entry_id, tariff, meter_entity)
+                TariffEnergy(hass, config_entry.entry_id, tariff_meter, tariff)
             )
-
-    if CONF_EXPORT_METER in config_entry.data:
-        for tariff in hass.data[DOMAIN][config_entry.entry_id].plano.tarifas:
             entities.append(
-                NetMeterSensor(
-                    hass,
-                    config_entry.entry_id,
-                    config_entry.data[CONF_EXPORT_METER],
-                    tariff,
-                    [
-                        meter_entity
-                        for meter_entity in config_entry.data[
-                            f"{tariff.name}{CONF_METER_SUFFIX}"
-                        ]
-                    ],
-                )
+                TariffEnergyCost(hass, config_entry.entry_id, tariff_meter, tariff)
             )
 
-    # TODO filter out to create a FixedCost of the monthly utility_meter entity
-    entities.append(FixedCost(hass, config_entry.entry_id, meter_entity))
+    if CONF_EXPORT_METER in config_entry.data:
+        entity_platform.async_get_current_platform().async_register_entity_service(
+            "net_history",
+            {},
+            "async_get_history",
+            supports_response=SupportsResponse.ONLY,
+        )
+        net_meter = NetMeterTracker(
+            hass,
+            hass.data[DOMAIN][config_entry.entry_id],
+            {
+                tariff: [energy_sensor]
+                if energy_sensor is not None
+                else [meter for meter in meters if meters[meter] == tariff]
+                for tariff in hass.data[DOMAIN][
+                    config_entry.entry_id
+                ].operator.plano.tarifas
+            },
+            cv.ensure_list(config_entry.data[CONF_EXPORT_METER]),
+            config_entry.data.get(CONF_PER_PHASE, False),
+            bill,
+        )
+        entities.extend(
+            NetMeterSensor(hass, config_entry.entry_id, net_meter, tariff)
+            for tariff in hass.data[DOMAIN][
+                config_entry.entry_id
+            ].operator.plano.tarifas
+        )
+        entities.append(FeedInRevenue(hass, config_entry.entry_id, net_meter))
+        entities.append(SelfConsumptionValue(hass, config_entry.entry_id, net_meter))
+
+    entities.append(FixedCost(hass, config_entry.entry_id, meter_entity, bill))
 
     entities.append(TotalCost(hass, config_entry.entry_id, entities))
 
+    entities.extend(
+        BillComponent(hass, config_entry.entry_id, bill, component)
+        for component in BILL_COMPONENTS
+    )
+
+    entity_platform.async_get_current_platform().async_register_entity_service(
+        "profile",
+        {},
+        "async_get_profile",
+        supports_response=SupportsResponse.ONLY,
+    )
+    entities.append(
+        WeekProfileSensor(hass, config_entry.entry_id, meters, bill, tariff_meter)
+    )
+
+    entities.append(UnitPrice(hass, config_entry.entry_id, bill))
+
+    if CONF_POWER_SENSOR in config_entry.data:
+        entities.append(
+            QuarterHourDemand(
+                hass,
+                config_entry.entry_id,
+                config_entry.data[CONF_POWER_SENSOR],
+                meters,
+            )
+        )
+
+    if appliances := hass.data[DOMAIN][config_entry.entry_id].appliances:
+        tracker = ApplianceCostTracker(
+            hass, hass.data[DOMAIN][config_entry.entry_id], appliances, bill
+        )
+        config_entry.async_on_unload(tracker.async_start())
+        entities.extend(
+            ApplianceCost(hass, config_entry.entry_id, tracker, appliance)
+            for appliance in appliances
+        )
+
     async_add_entities(entities)
 
 
+def energy_kwh(state: State | None) -> float | None:
+    """Energy of a meter state in kWh, None if not available."""
+    if state is None or state.state in [STATE_UNAVAILABLE, STATE_UNKNOWN]:
+        return None
+
+    unit = state.attributes.get(ATTR_UNIT_OF_MEASUREMENT)
+    try:
+        if unit == UnitOfEnergy.KILO_WATT_HOUR:
+            return float(state.state)
+        if unit == UnitOfEnergy.WATT_HOUR:
+            return float(state.state) / 1000
+    except ValueError:
+        pass
+    return None
+
+
 @dataclass
 class NetMeterSensorExtraStoredData(SensorExtraStoredData):
     """Object to store extra NetMeterSensor data."""
 
-    last_total: float | None
-    last_export: float | None
+    readings: dict[str, float | None]
     last_balance_datetime: datetime | None
+    history: dict[str, Any] | None = None
 
     def as_dict(self) -> dict[str, Any]:
         """Return dictionary version of this object."""
         data = super().as_dict()
-        data["last_total"] = self.last_total
-        data["last_export"] = self.last_export
+        data["readings"] = self.readings
         if isinstance(self.last_balance_datetime, (datetime)):
             data["last_balance_datetime"] = self.last_balance_datetime.isoformat()
+        data["history"] = self.history
         return data
 
     @classmethod
@@ -130,18 +267,16 @@ class NetMeterSensorExtraStoredData(SensorExtraStoredData):
             return None
 
         try:
-            last_total = float(restored.get("last_total"))
-        except (TypeError, ValueError):
-            last_total = None
-
-        try:
-            last_export = float(restored.get("last_export"))
-        except (TypeError, ValueError):
-            last_export = None
+            readings = {
+                meter: None if value is None else float(value)
+                for meter, value in restored.get("readings", {}).items()
+            }
+        except (AttributeError, TypeError, ValueError):
+            readings = {}
 
         try:
             last_balance_datetime: datetime | None = dt_util.parse_datetime(
-                restored.get("last_reset")
+                restored.get("last_balance_datetime")
             )
         except (TypeError, ValueError):
             last_balance_datetime = None
@@ -149,13 +284,43 @@ class NetMeterSensorExtraStoredData(SensorExtraStoredData):
         return cls(
             extra.native_value,
             extra.native_unit_of_measurement,
-            last_total,
-            last_export,
+            readings,
             last_balance_datetime,
+            restored.get("history"),
         )
 
 
-class TotalCost(ERSEMoneyEntity, SensorEntity):
+@dataclass
+class TotalCostExtraStoredData(SensorExtraStoredData):
+    """Object to store extra TotalCost data."""
+
+    parts: dict[str, float]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return dictionary version of this object."""
+        data = super().as_dict()
+        data["parts"] = self.parts
+        return data
+
+    @classmethod
+    def from_dict(cls, restored: dict[str, Any]) -> Self | None:
+        """Initialize a stored sensor state from a dict."""
+        extra = SensorExtraStoredData.from_dict(restored)
+        if extra is None:
+            return None
+
+        try:
+            parts = {
+                unique_id: float(value)
+                for unique_id, value in restored.get("parts", {}).items()
+            }
+        except (AttributeError, TypeError, ValueError):
+            parts = {}
+
+        return cls(extra.native_value, extra.native_unit_of_measurement, parts)
+
+
+class TotalCost(ERSEMoneyEntity, RestoreSensor):
     """Track total cost."""
 
     _attr_translation_key = "total_cost"
@@ -166,48 +331,340 @@ class TotalCost(ERSEMoneyEntity, SensorEntity):
 
         self._attr_unique_id = slugify(f"{entry_id} total cost")
         self._all_entities = all_entities
+        self._signal = SIGNAL_COST_UPDATED.format(entry_id)
+        self._parts: dict[str, float] = {}
 
     async def async_added_to_hass(self):
-        """Handle entity which will be tracked."""
+        """Restore the last total and follow the costs it is made of."""
         await super().async_added_to_hass()
 
-        @callback
-        async def calc_costs():
-            try:
-                self._attr_native_value = sum(
-                    float(self.hass.states.get(cost).state)
-                    for cost in self._all_entities
-                )
-            except ValueError as err:
-                _LOGGER.error(err)
-                self._attr_native_value = None
+        parts = [
+            entity
+            for entity in self._all_entities
+            if isinstance(entity, (TariffCost, TariffEnergyCost, FixedCost))
+        ]
+        _LOGGER.debug("Total Cost is the sum of %s", [part.unique_id for part in parts])
 
-            _LOGGER.debug("Total Cost = %s", self._attr_native_value)
-            self.async_write_ha_state()
+        if (last_sensor_data := await self.async_get_last_sensor_data()) is not None:
+            self._attr_native_value = last_sensor_data.native_value
+            # costs that are no longer configured are left out
+            self._parts = {
+                part.unique_id: last_sensor_data.parts[part.unique_id]
+                for part in parts
+                if part.unique_id in last_sensor_data.parts
+            }
+
+        # costs already computed before we started listening
+        for part in parts:
+            if part.native_value is not None:
+                self._parts[part.unique_id] = part.native_value
+
+        self.async_on_remove(
+            async_dispatcher_connect(self.hass, self._signal, self._async_part_updated)
+        )
+        self._async_update()
+
+    @callback
+    def _async_part_updated(self, unique_id: str, value: float) -> None:
+        """Handle a new value of one of the costs."""
+        if self._parts.get(unique_id) == value:
+            return
+        self._parts[unique_id] = value
+        self._async_update()
+
+    @callback
+    def _async_update(self) -> None:
+        """Publish the sum of the costs."""
+        if self._parts:
+            self._attr_native_value = sum(self._parts.values())
+
+        _LOGGER.debug("Total Cost = %s", self._attr_native_value)
+        self.async_write_ha_state()
+        self._data.feed.async_set(FEED_TOTAL, self._attr_native_value)
+
+    @property
+    def extra_restore_state_data(self) -> TotalCostExtraStoredData:
+        """Return sensor specific state data to be restored."""
+        return TotalCostExtraStoredData(
+            self.native_value, self.native_unit_of_measurement, self._parts
+        )
+
+    async def async_get_last_sensor_data(
+        self,
+    ) -> TotalCostExtraStoredData | None:
+        """Restore Total Cost Extra Stored Data."""
+        if (restored_last_extra_data := await self.async_get_last_extra_data()) is None:
+            return None
+
+        return TotalCostExtraStoredData.from_dict(restored_last_extra_data.as_dict())
+
+
+class NetMeterTracker:
+    """Net the import and export meters of an entry at the end of each interval.
+
+    The import meters of every tariff and the export meters are read into one
+    flat array, so the energy of all of them is worked out in a single pass
+    and only the tariff that was in force is netted and credited.
+    """
+
+    def __init__(
+        self,
+        hass,
+        data: ERSEData,
+        meters: dict[Tarifa, list[str]],
+        export_meters: list[str],
+        per_phase: bool,
+        bill: BillTracker,
+    ) -> None:
+        """Initialize the tracker."""
+        self._hass = hass
+        self._data = data
+        self.bill = bill
+        self._export_meters = export_meters
+        self._meters = [
+            meter for tariff_meters in meters.values() for meter in tariff_meters
+        ] + export_meters
+
+        self._imports: dict[Tarifa, slice] = {}
+        offset = 0
+        for tariff, tariff_meters in meters.items():
+            self._imports[tariff] = slice(offset, offset + len(tariff_meters))
+            offset += len(tariff_meters)
+        self._exports = slice(offset, offset + len(export_meters))
+
+        if per_phase and any(
+            len(tariff_meters) != len(export_meters)
+            for tariff_meters in meters.values()
+        ):
+            _LOGGER.warning(
+                "Per phase net metering needs one export meter for each meter of a tariff, netting all phases together"
+            )
+            per_phase = False
+        self._per_phase = per_phase
+
+        self._last = array("d", [nan]) * len(self._meters)
+        self.last_balance_datetime: datetime | None = None
+        self.unit: str | None = None
+        self._sensors: dict[Tarifa, NetMeterSensor] = {}
+        self._value_sensors: set[NetMeterValue] = set()
+        self._unsubs: list[CALLBACK_TYPE] = []
+
+    @property
+    def readings(self) -> dict[str, float | None]:
+        """Last reading of each meter."""
+        return {
+            meter: None if isnan(value) else value
+            for meter, value in zip(self._meters, self._last)
+        }
+
+    @callback
+    def async_add_sensor(
+        self,
+        sensor: NetMeterSensor,
+        readings: dict[str, float | None] | None,
+        last_balance_datetime: datetime | None,
+    ) -> CALLBACK_TYPE:
+        """Publish the net balance of a tariff, the first one starts the tracking."""
+        self._sensors[sensor.tariff] = sensor
+
+        if not self._unsubs:
+            if (
+                readings
+                and last_balance_datetime is not None
+                and dt_util.now() - last_balance_datetime <= timedelta(minutes=15)
+            ):
+                # still in the interval in which we stopped
+                self._last = array(
+                    "d",
+                    [
+                        nan if readings.get(meter) is None else readings[meter]
+                        for meter in self._meters
+                    ],
+                )
+                self.last_balance_datetime = last_balance_datetime
+            self._unsubs.append(async_at_start(self._hass, self._async_start))
 
         @callback
-        async def async_increment_cost(event):
-            await calc_costs()
+        def async_remove_sensor() -> None:
+            self._sensors.pop(sensor.tariff, None)
+            if not self._sensors:
+                while self._unsubs:
+                    self._unsubs.pop()()
+
+        return async_remove_sensor
+
+    @callback
+    def async_add_value_sensor(self, sensor: NetMeterValue) -> CALLBACK_TYPE:
+        """Price the balance of every interval, whatever the tariff."""
+        self._value_sensors.add(sensor)
 
         @callback
-        async def initial_sync(_):
-            # convert objects into entity_ids
-            self._all_entities = [
-                entity.entity_id
-                for entity in self._all_entities
-                if isinstance(entity, (TariffCost, FixedCost))
-            ]
-            _LOGGER.debug("Total Cost is the sum of %s", self._all_entities)
+        def async_remove_sensor() -> None:
+            self._value_sensors.discard(sensor)
 
-            self.async_on_remove(
-                async_track_state_change_event(
-                    self.hass, self._all_entities, async_increment_cost
+        return async_remove_sensor
+
+    def _read(self) -> array:
+        """Current reading of each meter, NaN if not available."""
+        readings = array("d", [nan]) * len(self._meters)
+        for index, meter in enumerate(self._meters):
+            try:
+                readings[index] = float(self._hass.states.get(meter).state)
+            except (AttributeError, ValueError) as err:
+                _LOGGER.error("Could not get state from %s: %s", meter, err)
+        return readings
+
+    @callback
+    def _async_start(self, _) -> None:
+        """Validate the meters and start netting."""
+        units = {
+            meter: state.attributes.get(ATTR_UNIT_OF_MEASUREMENT)
+            if (state := self._hass.states.get(meter)) is not None
+            else None
+            for meter in self._meters
+        }
+        export_entity = self._export_meters[0]
+        self.unit = units[export_entity]
+
+        # Validate that all meters have the same unit of measurement
+        for meter, meter_unit in units.items():
+            if self.unit != meter_unit:
+                _LOGGER.error(
+                    "Mismatching units of measurement for %s(%s) vs %s(%s)",
+                    export_entity,
+                    self.unit,
+                    meter,
+                    meter_unit,
                 )
+                ir.async_create_issue(
+                    self._hass,
+                    DOMAIN,
+                    "unit_of_measurement_missmatch",
+                    is_fixable=False,
+                    is_persistent=True,
+                    severity=ir.IssueSeverity.ERROR,
+                    translation_key="unit_of_measurement_missmatch",
+                    translation_placeholders={
+                        "export_entity": export_entity,
+                        "export_unit": self.unit,
+                        "meter_entity": meter,
+                        "meter_unit": meter_unit,
+                    },
+                )
+                return
+
+        self._async_interval(None)
+
+        self._unsubs.append(
+            async_track_time_change(
+                self._hass, self._async_interval, minute=range(0, 60, 15), second=0
+            )
+        )
+
+    @callback
+    def _async_interval(self, _) -> None:
+        """Net the interval that just ended."""
+        now = dt_util.now()
+        # We need the tariff of the previous minute because it might have just changed
+        tariff = self._data.timeline.tariff_at(now - timedelta(minutes=1))
+
+        readings = self._read()
+        deltas = interval_deltas(readings, self._last)
+        self._last = readings
+        self.last_balance_datetime = now
+
+        period_import, period_export, net, surplus = net_balance(
+            deltas[self._imports[tariff]], deltas[self._exports], self._per_phase
+        )
+        _LOGGER.debug(
+            "%s period_import = %s, period_export = %s, net = %s, surplus = %s",
+            tariff.value,
+            period_import,
+            period_export,
+            net,
+            surplus,
+        )
+
+        if (sensor := self._sensors.get(tariff)) is not None:
+            sensor.async_add_interval(now, period_import, period_export, net)
+
+        to_kwh = 1 / 1000 if self.unit == UnitOfEnergy.WATT_HOUR else 1
+        for value_sensor in self._value_sensors:
+            value_sensor.async_add_interval(
+                now, tariff, (period_import - net) * to_kwh, surplus * to_kwh
             )
 
-            await calc_costs()
 
-        self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_START, initial_sync)
+class NetMeterValue(ERSEMoneyEntity, RestoreSensor):
+    """Money made or saved by the exported energy of the net metering intervals."""
+
+    def __init__(self, hass, entry_id, tracker, key) -> None:
+        """Initialize the value sensor."""
+        super().__init__(hass.data[DOMAIN][entry_id])
+
+        self._attr_translation_key = key
+        self._attr_unique_id = slugify(f"{entry_id} {key}")
+        self._attr_native_value: float = 0
+
+        self._tracker = tracker
+
+    async def async_added_to_hass(self):
+        """Restore the value and start pricing the intervals."""
+        await super().async_added_to_hass()
+
+        if (last_sensor_data := await self.async_get_last_sensor_data()) is not None:
+            try:
+                self._attr_native_value = float(last_sensor_data.native_value)
+            except (TypeError, ValueError):
+                pass
+
+        self.async_on_remove(self._tracker.async_add_value_sensor(self))
+
+    @abstractmethod
+    def _interval_value(
+        self, end: datetime, tariff: Tarifa, offset: float, surplus: float
+    ) -> float:
+        """Value of an interval from the netted import and the surplus (kWh)."""
+
+    @callback
+    def async_add_interval(
+        self, end: datetime, tariff: Tarifa, offset: float, surplus: float
+    ) -> None:
+        """Add the value of an interval."""
+        if value := self._interval_value(end, tariff, offset, surplus):
+            self._attr_native_value += value
+            self.async_write_ha_state()
+
+
+class FeedInRevenue(NetMeterValue):
+    """Surplus exported to the grid, priced at the feed-in rate."""
+
+    def __init__(self, hass, entry_id, tracker) -> None:
+        """Initialize the feed-in revenue."""
+        super().__init__(hass, entry_id, tracker, "feed_in_revenue")
+
+    def _interval_value(
+        self, end: datetime, tariff: Tarifa, offset: float, surplus: float
+    ) -> float:
+        return surplus * self._data.feed_in_rate
+
+
+class SelfConsumptionValue(NetMeterValue):
+    """Import avoided by netting the export, priced at the tariff in force.
+
+    The avoided import is priced at the final price, with the excise tax and
+    the VAT rate of the bill of the cycle, like the tariff costs.
+    """
+
+    def __init__(self, hass, entry_id, tracker) -> None:
+        """Initialize the self-consumption value."""
+        super().__init__(hass, entry_id, tracker, "self_consumption_value")
+
+    def _interval_value(
+        self, end: datetime, tariff: Tarifa, offset: float, surplus: float
+    ) -> float:
+        price = self._data.prices.price(tariff, end)
+        return offset * self._tracker.bill.engine.unit_price(tariff, price)
 
 
 class NetMeterSensor(ERSEEntity, RestoreSensor):
@@ -217,174 +674,66 @@ class NetMeterSensor(ERSEEntity, RestoreSensor):
     _attr_state_class = SensorStateClass.TOTAL_INCREASING
     _attr_suggested_display_precision = ENERGY_PRECISION
 
-    def __init__(self, hass, entry_id, export_entity, tariff, meter_entities):
-        """Initialize netmeter tracker"""
+    def __init__(self, hass, entry_id, tracker, tariff):
+        """Initialize netmeter sensor"""
         super().__init__(hass.data[DOMAIN][entry_id])
 
         self._attr_name = f"{tariff.value} Net"
         self._attr_unique_id = slugify(f"{entry_id} {tariff} netmeter")
         self._attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
 
-        self._export_entity = export_entity
-        self._tariff = tariff
-        self._meter_entities = meter_entities
-        self._last_total: float | None = None
-        self._last_export: float | None = None
+        self._tracker = tracker
+        self.tariff = tariff
         self._attr_native_value: float = 0  # net metering
-        self._last_balance_datetime: datetime | None = None
+        self._history = IntervalHistory(NET_HISTORY_SIZE)
 
     async def async_added_to_hass(self):
-        """Setups all required entities and automations."""
+        """Restore the balance and start netting."""
+        await super().async_added_to_hass()
 
+        readings, last_balance_datetime = None, None
         if (last_sensor_data := await self.async_get_last_sensor_data()) is not None:
             self._attr_native_value = last_sensor_data.native_value
             self._attr_native_unit_of_measurement = (
                 last_sensor_data.native_unit_of_measurement
             )
-            self._last_total = last_sensor_data.last_total
-            self._last_export = last_sensor_data.last_export
-            self._last_balance_datetime = last_sensor_data.last_balance_datetime
+            readings = last_sensor_data.readings
+            last_balance_datetime = last_sensor_data.last_balance_datetime
+            self._history.restore(last_sensor_data.history)
 
             _LOGGER.debug(
-                "Restored state %s(%s) and last_total = %s, last_export = %s, last_balance_datetime = %s",
+                "Restored state %s(%s) and readings = %s, last_balance_datetime = %s",
                 self._attr_native_value,
                 self._attr_native_unit_of_measurement,
-                self._last_total,
-                self._last_export,
-                self._last_balance_datetime,
-            )
-
-        @callback
-        async def sum_meters():
-            """Sum all meters."""
-            total = 0
-            for meter in self._meter_entities:
-                try:
-                    total += float(self.hass.states.get(meter).state)
-                except ValueError as err:
-                    _LOGGER.error("Could not get state from %s: %s", meter, err)
-
-            _LOGGER.debug(
-                "%s sum_meters(%s) = %s",
-                self._tariff.value,
-                self._meter_entities,
-                total,
+                readings,
+                last_balance_datetime,
             )
-            return total
-
-        @callback
-        async def timer_update(_):
-            """Change tariff based on timer."""
-            self._last_balance_datetime = datetime.now()
-
-            if (
-                self._tariff
-                != self._operator.plano.tarifa_actual(
-                    datetime.now() - timedelta(minutes=1)
-                ).value
-            ):  # We need the tariff of the previous minute because it might have just changed
-                self.async_write_ha_state()
-                return  # tariff not active
-
-            current_tariff = await sum_meters()
-            period_total = current_tariff - self._last_total
-            if period_total < 0:
-                _LOGGER.debug(
-                    "%s period_total < 0, probably a reset! using current value %s",
-                    self.name,
-                    current_tariff,
-                )
-                period_total = current_tariff
-                self._last_total = current_tariff
-            _LOGGER.debug("%s period_total = %s", self._tariff.value, period_total)
-
-            current_export = float(self.hass.states.get(self._export_entity).state)
-            period_export = current_export - self._last_export
-            if period_export < 0:
-                _LOGGER.debug(
-                    "%s period_export < 0, probably a reset! using current value %s",
-                    self.friendly_name,
-                    current_export,
-                )
-                period_export = current_export
-                self._last_export = current_export
-            _LOGGER.debug("%s period_export = %s", self._tariff.value, period_export)
-
-            # Did we consume from the network ?
-            balance = period_total - period_export
-            if balance > 0:
-                self._attr_native_value += balance
-
-            # update last values
-            self._last_total = current_tariff
-            self._last_export = current_export
-
-            self.async_write_ha_state()
-
-        @callback
-        async def initial_sync(_):
-            """Initialize netmeter counters."""
-
-            if self._last_balance_datetime is None:
-                self._last_balance_datetime = datetime.now()
-                in_same_net_meter_period = False
-            else:
-                in_same_net_meter_period = (
-                    datetime.now() - self._last_balance_datetime
-                    <= timedelta(minutes=15)
-                )
-
-            if self._last_total is None or not in_same_net_meter_period:
-                self._last_total = await sum_meters()
-            if self._last_export is None or not in_same_net_meter_period:
-                export_state = self.hass.states.get(self._export_entity)
-                self._last_export = float(export_state.state)
-
-                self._attr_native_unit_of_measurement = export_state.attributes.get(
-                    ATTR_UNIT_OF_MEASUREMENT
-                )
-
-            """Validate that all meters have the same unit of measurement."""
-            for meter in self._meter_entities:
-                meter_state = self.hass.states.get(meter)
-                meter_unit = meter_state.attributes.get(ATTR_UNIT_OF_MEASUREMENT)
-                if self._attr_native_unit_of_measurement != meter_unit:
-                    _LOGGER.error(
-                        "Mismatching units of measurement for %s(%s) vs %s(%s)",
-                        self._export_entity,
-                        self._attr_native_unit_of_measurement,
-                        meter,
-                        meter_unit,
-                    )
-                    ir.async_create_issue(
-                        self.hass,
-                        DOMAIN,
-                        "unit_of_measurement_missmatch",
-                        is_fixable=False,
-                        is_persistent=True,
-                        severity=ir.IssueSeverity.ERROR,
-                        translation_key="unit_of_measurement_missmatch",
-                        translation_placeholders={
-                            "export_entity": self._export_entity,
-                            "export_unit": self._attr_native_unit_of_measurement,
-                            "meter_entity": meter,
-                            "meter_unit": meter_unit,
-                        },
-                    )
-                    return
-
-            await timer_update(None)
 
-            self.async_on_remove(
-                async_track_time_change(
-                    self.hass,
-                    timer_update,
-                    minute=range(0, 60, 15),
-                    second=0,  # TODO after dev change 5 to 15
-                )
-            )
+        self.async_on_remove(
+            self._tracker.async_add_sensor(self, readings, last_balance_datetime)
+        )
 
-        self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_START, initial_sync)
+    @callback
+    def async_add_interval(
+        self,
+        end: datetime,
+        period_import: float,
+        period_export: float,
+        net: float,
+    ) -> None:
+        """Add the balance of an interval in which this tariff was in force."""
+        self._history.append(end, period_import, period_export)
+
+        # Did we consume from the network ?
+        if net > 0:
+            self._attr_native_value += net
+
+        if self._tracker.unit is not None:
+            self._attr_native_unit_of_measurement = self._tracker.unit
+        self.async_write_ha_state()
+        self._data.feed.async_set(
+            (FEED_NET, self.tariff.value), self._attr_native_value
+        )
 
     @property
     def extra_restore_state_data(self) -> NetMeterSensorExtraStoredData:
@@ -392,11 +741,15 @@ class NetMeterSensor(ERSEEntity, RestoreSensor):
         return NetMeterSensorExtraStoredData(
             self.native_value,
             self.native_unit_of_measurement,
-            self._last_total,
-            self._last_export,
-            self._last_balance_datetime,
+            self._tracker.readings,
+            self._tracker.last_balance_datetime,
+            self._history.as_dict(),
         )
 
+    async def async_get_history(self) -> ServiceResponse:
+        """Return the balance of the last net metering intervals."""
+        return {"intervals": self._history.as_list()}
+
     async def async_get_last_sensor_data(
         self,
     ) -> NetMeterSensorExtraStoredData | None:
@@ -409,7 +762,36 @@ class NetMeterSensor(ERSEEntity, RestoreSensor):
         )
 
 
-class TariffCost(ERSEMoneyEntity, SensorEntity):
+@dataclass
+class TariffCostExtraStoredData(SensorExtraStoredData):
+    """Object to store extra TariffCost data."""
+
+    bill: dict[str, Any] | None
+    meter_name: str | None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return dictionary version of this object."""
+        data = super().as_dict()
+        data["bill"] = self.bill
+        data["meter_name"] = self.meter_name
+        return data
+
+    @classmethod
+    def from_dict(cls, restored: dict[str, Any]) -> Self | None:
+        """Initialize a stored sensor state from a dict."""
+        extra = SensorExtraStoredData.from_dict(restored)
+        if extra is None:
+            return None
+
+        return cls(
+            extra.native_value,
+            extra.native_unit_of_measurement,
+            restored.get("bill"),
+            restored.get("meter_name"),
+        )
+
+
+class TariffCost(ERSEMoneyEntity, RestoreSensor):
     """Track cost of kWh for a given tariff"""
 
     def __init__(self, hass, entry_id, tariff, meter_entity):
@@ -421,115 +803,211 @@ class TariffCost(ERSEMoneyEntity, SensorEntity):
 
         self._tariff = tariff
         self._meter_entity = meter_entity
+        self._bill = BillEngine(self._operator.plano)
+        self._signal = SIGNAL_COST_UPDATED.format(entry_id)
 
     @property
     def extra_state_attributes(self):
         return {ATTR_COST: self._operator.plano.custo_tarifa(self._tariff)}
 
     async def async_added_to_hass(self):
-        """Handle entity which will be tracked."""
+        """Restore the last cost and follow the meter as soon as it is available."""
         await super().async_added_to_hass()
 
-        @callback
-        async def calc_costs(meter_state):
-            if (
-                meter_state
-                and ATTR_UNIT_OF_MEASUREMENT in meter_state.attributes
-                and meter_state.attributes[ATTR_UNIT_OF_MEASUREMENT]
-                in [
-                    UnitOfEnergy.WATT_HOUR,
-                    UnitOfEnergy.KILO_WATT_HOUR,
-                ]
-            ):
-                if meter_state.state in [STATE_UNAVAILABLE, STATE_UNKNOWN]:
-                    kwh = 0
-                elif (
-                    meter_state.attributes[ATTR_UNIT_OF_MEASUREMENT]
-                    == UnitOfEnergy.WATT_HOUR
-                ):
-                    kwh = float(meter_state.state) / 1000
-                else:
-                    kwh = float(meter_state.state)
-            else:
+        if (last_sensor_data := await self.async_get_last_sensor_data()) is not None:
+            self._attr_native_value = last_sensor_data.native_value
+            self._attr_name = last_sensor_data.meter_name
+            self._bill.restore(last_sensor_data.bill)
+            self._async_publish()
+
+        self.async_on_remove(
+            async_track_state_change_event(
+                self.hass, [self._meter_entity], self._async_meter_changed
+            )
+        )
+        if (meter_state := self.hass.states.get(self._meter_entity)) is not None:
+            self._async_calc_costs(meter_state)
+
+    @callback
+    def _async_meter_changed(self, event: Event) -> None:
+        """Handle a new meter reading."""
+        self._async_calc_costs(event.data.get("new_state"))
+
+    @callback
+    def _async_calc_costs(self, meter_state: State | None) -> None:
+        """Add the energy read since the last reading at the price in force.
+
+        Earlier energy keeps the price it was consumed at, so new prices don't
+        restate the cycle. Only published if the reading changed.
+        """
+        if (kwh := energy_kwh(meter_state)) is None:
+            if meter_state is not None and meter_state.state not in [
+                STATE_UNAVAILABLE,
+                STATE_UNKNOWN,
+            ]:
                 _LOGGER.error(
                     "Could not retrieve tariff sensor state or the sensor is not an energy sensor (wrong unit) from %s",
                     meter_state,
                 )
-                kwh = 0
+            # keep the last cost while the meter is not available
+            return
 
-            self._attr_native_value = self._operator.plano.custo_kWh_final(
-                self._tariff, kwh
-            )
+        name = meter_state.attributes.get("friendly_name")
+        last_kwh = self._bill.readings.get(self._meter_entity, 0)
+        if (
+            kwh == last_kwh
+            and name == self._attr_name
+            and self._attr_native_value is not None
+        ):
+            return
 
-            _LOGGER.debug(
-                "{%s} calc_costs(%s) = %s",
-                self._attr_name,
-                kwh,
-                self._attr_native_value,
+        self._attr_name = name
+        delta = kwh - last_kwh
+        if delta < 0:  # meter reset, a new cycle
+            self._bill.reset()
+            delta = kwh
+        self._bill.readings[self._meter_entity] = kwh
+        if delta:
+            self._bill.add(
+                self._tariff,
+                delta,
+                self._data.prices.price(self._tariff, meter_state.last_updated),
             )
-            self.async_write_ha_state()
-
-        @callback
-        async def async_increment_cost(event):
-            new_state = event.data.get("new_state")
-            await calc_costs(new_state)
-
-        @callback
-        async def initial_sync(_):
-            meter_state = self.hass.states.get(self._meter_entity)
-            self._attr_name = meter_state.attributes.get("friendly_name")
-            await calc_costs(meter_state)
+        self._attr_native_value = self._bill.energy_cost()
 
-            self.async_on_remove(
-                async_track_state_change_event(
-                    self.hass, [self._meter_entity], async_increment_cost
-                )
-            )
+        _LOGGER.debug(
+            "{%s} calc_costs(%s) = %s",
+            self._attr_name,
+            kwh,
+            self._attr_native_value,
+        )
+        self._async_publish()
 
-        self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_START, initial_sync)
+    @callback
+    def _async_publish(self) -> None:
+        """Write the state and share the cost with the total and the feed."""
+        self.async_write_ha_state()
+        if self._attr_native_value is None:
+            return
+        async_dispatcher_send(
+            self.hass, self._signal, self.unique_id, self._attr_native_value
+        )
+        self._data.feed.async_set_part(
+            (FEED_COST, self._tariff.value),
+            self._meter_entity,
+            self._attr_native_value,
+        )
 
+    @property
+    def extra_restore_state_data(self) -> TariffCostExtraStoredData:
+        """Return sensor specific state data to be restored."""
+        return TariffCostExtraStoredData(
+            self.native_value,
+            self.native_unit_of_measurement,
+            self._bill.as_dict(),
+            self._attr_name,
+        )
 
-class FixedCost(ERSEMoneyEntity, SensorEntity):
-    """Track fixed costs."""
+    async def async_get_last_sensor_data(
+        self,
+    ) -> TariffCostExtraStoredData | None:
+        """Restore Tariff Cost Extra Stored Data."""
+        if (restored_last_extra_data := await self.async_get_last_extra_data()) is None:
+            return None
 
-    _attr_translation_key = "fixed_cost"
+        return TariffCostExtraStoredData.from_dict(restored_last_extra_data.as_dict())
 
-    def __init__(self, hass, entry_id, any_meter) -> None:
-        """Initialize fixed costs"""
-        if any_meter is None:
-            _LOGGER.error("No meter sensor entities defined")
-            return
 
-        super().__init__(hass.data[DOMAIN][entry_id])
+@dataclass
+class FixedCostExtraStoredData(SensorExtraStoredData):
+    """Object to store extra FixedCost data."""
 
-        self._attr_unique_id = slugify(f"{entry_id} {any_meter} fixed cost")
+    cycle_start: datetime | None
 
-        self._meter = any_meter
+    def as_dict(self) -> dict[str, Any]:
+        """Return dictionary version of this object."""
+        data = super().as_dict()
+        if isinstance(self.cycle_start, (datetime)):
+            data["cycle_start"] = self.cycle_start.isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, restored: dict[str, Any]) -> Self | None:
+        """Initialize a stored sensor state from a dict."""
+        extra = SensorExtraStoredData.from_dict(restored)
+        if extra is None:
+            return None
+
+        try:
+            cycle_start: datetime | None = dt_util.parse_datetime(
+                restored.get("cycle_start")
+            )
+        except (TypeError, ValueError):
+            cycle_start = None
+
+        return cls(extra.native_value, extra.native_unit_of_measurement, cycle_start)
+
+
+class FixedCost(ERSEMoneyEntity, RestoreSensor):
+    """Track fixed costs over the billing cycle of the bill."""
+
+    _attr_translation_key = "fixed_cost"
+
+    def __init__(self, hass, entry_id, any_meter, bill) -> None:
+        """Initialize fixed costs"""
+        if any_meter is None:
+            _LOGGER.error("No meter sensor entities defined")
+            return
+
+        super().__init__(hass.data[DOMAIN][entry_id])
+
+        self._attr_unique_id = slugify(f"{entry_id} {any_meter} fixed cost")
+
+        self._bill = bill
+        self._cycle_start: datetime | None = None
+        self._signal = SIGNAL_COST_UPDATED.format(entry_id)
 
     async def async_added_to_hass(self):
         """Setups automations."""
         await super().async_added_to_hass()
 
-        @callback
-        async def initial_sync(_):
-            await self.timer_update(dt_util.now())
+        if (last_sensor_data := await self.async_get_last_sensor_data()) is not None:
+            self._attr_native_value = last_sensor_data.native_value
+            self._cycle_start = last_sensor_data.cycle_start
 
-            self.async_on_remove(
-                async_track_time_change(
-                    self.hass, self.timer_update, hour=[0], minute=[0], second=[0]
-                )
+        self.async_on_remove(self._bill.async_add_listener(self._async_bill_updated))
+        self.async_on_remove(
+            async_track_time_change(
+                self.hass, self.timer_update, hour=[0], minute=[0], second=[0]
             )
+        )
+        self._async_cycle_start()
+        self.timer_update(dt_util.now())
+
+    @callback
+    def _async_cycle_start(self) -> bool:
+        """Follow the start of the billing cycle, True if it changed."""
+        if (last_reset := self._bill.engine.cycle_start) is None:
+            return False
 
-        self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_START, initial_sync)
+        cycle_start = dt_util.parse_datetime(last_reset)
+        if cycle_start == self._cycle_start:
+            return False
+        self._cycle_start = cycle_start
+        return True
 
     @callback
-    async def timer_update(self, now):
-        """Update fixed costs as days go by."""
+    def _async_bill_updated(self) -> None:
+        """Recalculate when the bill starts a new cycle."""
+        if self._async_cycle_start():
+            self.timer_update(dt_util.now())
 
-        last_reset = self.hass.states.get(self._meter).attributes.get(ATTR_LAST_RESET)
+    @callback
+    def timer_update(self, now):
+        """Update fixed costs as days go by."""
 
-        if last_reset:
-            elapsed = now - dt_util.parse_datetime(last_reset)
+        if self._cycle_start:
+            elapsed = now - self._cycle_start
         else:
             elapsed = timedelta(days=0)
 
@@ -537,6 +1015,9 @@ class FixedCost(ERSEMoneyEntity, SensorEntity):
 
         _LOGGER.debug("Fixed Cost = %s", self._attr_native_value)
         self.async_write_ha_state()
+        async_dispatcher_send(
+            self.hass, self._signal, self.unique_id, self._attr_native_value
+        )
 
     @property
     def extra_state_attributes(self):
@@ -546,6 +1027,22 @@ class FixedCost(ERSEMoneyEntity, SensorEntity):
             )
         }
 
+    @property
+    def extra_restore_state_data(self) -> FixedCostExtraStoredData:
+        """Return sensor specific state data to be restored."""
+        return FixedCostExtraStoredData(
+            self.native_value, self.native_unit_of_measurement, self._cycle_start
+        )
+
+    async def async_get_last_sensor_data(
+        self,
+    ) -> FixedCostExtraStoredData | None:
+        """Restore Fixed Cost Extra Stored Data."""
+        if (restored_last_extra_data := await self.async_get_last_extra_data()) is None:
+            return None
+
+        return FixedCostExtraStoredData.from_dict(restored_last_extra_data.as_dict())
+
 
 class EletricityEntity(ERSEEntity):
     """Representation of an Electricity Tariff tracker."""
@@ -557,6 +1054,7 @@ class EletricityEntity(ERSEEntity):
         super().__init__(hass.data[DOMAIN][entry_id])
         self._utility_meters = utility_meters
         self._state = None
+        self._switch_skew: float | None = None
         self._attr_icon = ICON
         self._attr_unique_id = slugify(
             f"{entry_id} utility_meters {len(self._utility_meters)}"
@@ -565,8 +1063,46 @@ class EletricityEntity(ERSEEntity):
     async def async_added_to_hass(self):
         """Setups all required entities and automations."""
 
+        async def async_switch_utility_meters(now):
+            """Switch the utility meters to the current tariff."""
+            utility_meters = [
+                utility_meter
+                for utility_meter in self._utility_meters
+                if (meter_state := self.hass.states.get(utility_meter)) is None
+                or meter_state.state != self._state
+            ]
+            _LOGGER.debug("Change %s to %s", utility_meters, self._state)
+
+            results = await asyncio.gather(
+                *[
+                    self.hass.services.async_call(
+                        SELECT_DOMAIN,
+                        SERVICE_SELECT_OPTION,
+                        {ATTR_ENTITY_ID: utility_meter, ATTR_OPTION: self._state},
+                        blocking=True,
+                    )
+                    for utility_meter in utility_meters
+                ],
+                return_exceptions=True,
+            )
+            for utility_meter, result in zip(utility_meters, results):
+                if isinstance(result, Exception):
+                    _LOGGER.error(
+                        "Could not change %s to %s: %s",
+                        utility_meter,
+                        self._state,
+                        result,
+                    )
+
+            if now is not None and utility_meters:
+                # skew between the tariff boundary and the last completed switch
+                boundary = now.replace(second=0, microsecond=0)
+                self._switch_skew = round((dt_util.now() - boundary).total_seconds(), 3)
+                _LOGGER.debug("Switch skew %s s", self._switch_skew)
+                self.async_write_ha_state()
+
         @callback
-        async def timer_update(_):
+        def timer_update(now):
             """Change tariff based on timer."""
 
             new_state = self._operator.plano.tarifa_actual().value
@@ -576,17 +1112,12 @@ class EletricityEntity(ERSEEntity):
                 self._state = new_state
                 self.async_write_ha_state()
 
-                for utility_meter in self._utility_meters:
-                    _LOGGER.debug("Change %s to %s", utility_meter, self._state)
-                    await self.hass.services.async_call(
-                        SELECT_DOMAIN,
-                        SERVICE_SELECT_OPTION,
-                        {ATTR_ENTITY_ID: utility_meter, ATTR_OPTION: self._state},
-                    )
+                # only switching the meters needs a task
+                self.hass.async_create_task(async_switch_utility_meters(now))
 
         @callback
-        async def initial_sync(_):
-            await timer_update(None)
+        def initial_sync(_):
+            timer_update(None)
 
             self.async_on_remove(
                 async_track_time_change(
@@ -594,14 +1125,16 @@ class EletricityEntity(ERSEEntity):
                 )
             )
 
-        self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_START, initial_sync)
+        # right away if Home Assistant already started, e.g. on a reload
+        self.async_on_remove(async_at_start(self.hass, initial_sync))
 
     @property
     def extra_state_attributes(self):
         attrs = {
             ATTR_CURRENT_COST: self._operator.plano.custo_tarifa(
-                self._operator.plano.tarifa_actual()
-            )
+                self._data.timeline.tariff_at()
+            ),
+            ATTR_SWITCH_SKEW: self._switch_skew,
         }
         return attrs
 
@@ -618,3 +1151,1105 @@ class EletricityEntity(ERSEEntity):
             ATTR_UTILITY_METERS: self._utility_meters,
         }
         return attr
+
+
+class ApplianceCostTracker:
+    """Price the energy deltas of many appliances at the active tariff.
+
+    Deltas are priced at the final price, with the excise tax and the VAT
+    rate of the bill of the cycle, like the tariff costs.
+
+    A single state change listener serves all appliances and the resulting
+    state writes are batched, so each ApplianceCost is written at most once
+    every APPLIANCE_FLUSH_INTERVAL seconds regardless of how often its meter
+    reports.
+    """
+
+    def __init__(
+        self, hass, data: ERSEData, appliances: list[str], bill: BillTracker
+    ) -> None:
+        """Initialize the tracker."""
+        self._hass = hass
+        self._data = data
+        self._appliances = appliances
+        self._bill = bill
+        self._sensors: dict[str, ApplianceCost] = {}
+        self._dirty: set[ApplianceCost] = set()
+        self._unsub_flush: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_start(self) -> CALLBACK_TYPE:
+        """Start tracking the appliance meters."""
+        unsub_track = async_track_state_change_event(
+            self._hass, self._appliances, self._async_meter_changed
+        )
+
+        @callback
+        def async_stop() -> None:
+            unsub_track()
+            if self._unsub_flush is not None:
+                self._unsub_flush()
+                self._unsub_flush = None
+
+        return async_stop
+
+    @callback
+    def async_add_sensor(self, sensor: ApplianceCost) -> CALLBACK_TYPE:
+        """Start pricing the energy of an appliance."""
+        self._sensors[sensor.appliance] = sensor
+        # catch up with what the appliance read while we were not running
+        if self._async_reading(sensor, self._hass.states.get(sensor.appliance)):
+            sensor.async_write_ha_state()
+
+        @callback
+        def async_remove_sensor() -> None:
+            self._sensors.pop(sensor.appliance, None)
+            self._dirty.discard(sensor)
+
+        return async_remove_sensor
+
+    @callback
+    def _async_reading(self, sensor: ApplianceCost, state: State | None) -> bool:
+        """Price the energy read since the last known reading, True if any.
+
+        Readings while the appliance is unavailable are skipped, so the energy
+        used meanwhile is priced with the first reading after it is back.
+        """
+        if (kwh := energy_kwh(state)) is None:
+            return False
+
+        last, sensor.last_reading = sensor.last_reading, kwh
+        if last is None:
+            return False
+
+        delta = kwh - last
+        if delta < 0:  # meter reset
+            delta = kwh
+        if delta == 0:
+            return False
+
+        tariff = self._data.timeline.tariff_at(state.last_updated)
+        price = self._data.prices.price(tariff, state.last_updated)
+        sensor.add_cost(delta * self._bill.engine.unit_price(tariff, price))
+        return True
+
+    @callback
+    def _async_meter_changed(self, event: Event) -> None:
+        """Price the energy reported since the last known reading."""
+        if (sensor := self._sensors.get(event.data["entity_id"])) is None:
+            return
+
+        if not self._async_reading(sensor, event.data.get("new_state")):
+            return
+
+        self._dirty.add(sensor)
+        if self._unsub_flush is None:
+            self._unsub_flush = async_call_later(
+                self._hass, APPLIANCE_FLUSH_INTERVAL, self._async_flush
+            )
+
+    @callback
+    def _async_flush(self, _) -> None:
+        """Write the state of the appliances with new costs."""
+        self._unsub_flush = None
+        dirty, self._dirty = self._dirty, set()
+        for sensor in dirty:
+            sensor.async_write_ha_state()
+
+
+@dataclass
+class ApplianceCostExtraStoredData(SensorExtraStoredData):
+    """Object to store extra ApplianceCost data."""
+
+    last_reading: float | None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return dictionary version of this object."""
+        data = super().as_dict()
+        data["last_reading"] = self.last_reading
+        return data
+
+    @classmethod
+    def from_dict(cls, restored: dict[str, Any]) -> Self | None:
+        """Initialize a stored sensor state from a dict."""
+        extra = SensorExtraStoredData.from_dict(restored)
+        if extra is None:
+            return None
+
+        try:
+            last_reading = float(restored.get("last_reading"))
+        except (TypeError, ValueError):
+            last_reading = None
+
+        return cls(extra.native_value, extra.native_unit_of_measurement, last_reading)
+
+
+class ApplianceCost(ERSEMoneyEntity, RestoreSensor):
+    """Track the cost of the energy used by an appliance."""
+
+    def __init__(self, hass, entry_id, tracker, appliance) -> None:
+        """Initialize appliance cost tracker."""
+        super().__init__(hass.data[DOMAIN][entry_id])
+
+        self._attr_unique_id = slugify(f"{entry_id} {appliance} appliance cost")
+        self._attr_native_value: float = 0
+        if (appliance_state := hass.states.get(appliance)) is not None:
+            self._attr_name = appliance_state.attributes.get("friendly_name")
+        else:
+            self._attr_name = appliance
+
+        self._tracker = tracker
+        self.appliance = appliance
+        self.last_reading: float | None = None
+
+    async def async_added_to_hass(self):
+        """Restore the accumulated cost and start tracking."""
+        await super().async_added_to_hass()
+
+        if (last_sensor_data := await self.async_get_last_sensor_data()) is not None:
+            try:
+                self._attr_native_value = float(last_sensor_data.native_value)
+            except (TypeError, ValueError):
+                pass
+            self.last_reading = last_sensor_data.last_reading
+
+        self.async_on_remove(self._tracker.async_add_sensor(self))
+
+    def add_cost(self, cost: float) -> None:
+        """Add the cost of new energy used by the appliance."""
+        self._attr_native_value += cost
+
+    @property
+    def extra_restore_state_data(self) -> ApplianceCostExtraStoredData:
+        """Return sensor specific state data to be restored."""
+        return ApplianceCostExtraStoredData(
+            self.native_value, self.native_unit_of_measurement, self.last_reading
+        )
+
+    async def async_get_last_sensor_data(
+        self,
+    ) -> ApplianceCostExtraStoredData | None:
+        """Restore Appliance Cost Extra Stored Data."""
+        if (restored_last_extra_data := await self.async_get_last_extra_data()) is None:
+            return None
+
+        return ApplianceCostExtraStoredData.from_dict(
+            restored_last_extra_data.as_dict()
+        )
+
+
+@dataclass
+class TariffEnergyExtraStoredData(SensorExtraStoredData):
+    """Object to store extra TariffEnergy data."""
+
+    last_reading: float | None
+    last_reading_datetime: datetime | None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return dictionary version of this object."""
+        data = super().as_dict()
+        data["last_reading"] = self.last_reading
+        if isinstance(self.last_reading_datetime, (datetime)):
+            data["last_reading_datetime"] = self.last_reading_datetime.isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, restored: dict[str, Any]) -> Self | None:
+        """Initialize a stored sensor state from a dict."""
+        extra = SensorExtraStoredData.from_dict(restored)
+        if extra is None:
+            return None
+
+        try:
+            last_reading = float(restored.get("last_reading"))
+        except (TypeError, ValueError):
+            last_reading = None
+
+        try:
+            last_reading_datetime: datetime | None = dt_util.parse_datetime(
+                restored.get("last_reading_datetime")
+            )
+        except (TypeError, ValueError):
+            last_reading_datetime = None
+
+        return cls(
+            extra.native_value,
+            extra.native_unit_of_measurement,
+            last_reading,
+            last_reading_datetime,
+        )
+
+
+class TariffMeterTracker:
+    """Split the deltas of a raw energy sensor into per tariff buckets.
+
+    Deltas spanning a tariff boundary are split in proportion to the time
+    spent in each tariff, using the precomputed tariff timeline. The split
+    energy makes up the bill and the week profile, and is priced by the bill
+    so the costs are final, with the excise tax and the VAT rate of the cycle.
+    """
+
+    def __init__(
+        self, hass, data: ERSEData, energy_entity: str, bill: BillTracker
+    ) -> None:
+        """Initialize the tracker."""
+        self._hass = hass
+        self._data = data
+        self._energy_entity = energy_entity
+        self._bill = bill
+        self._energy: dict[Tarifa, TariffEnergy] = {}
+        self._cost: dict[Tarifa, TariffEnergyCost] = {}
+        self._profile: WeekProfileSensor | None = None
+        self.last_reading: float | None = None
+        self.last_reading_datetime: datetime | None = None
+
+    @callback
+    def async_start(self) -> CALLBACK_TYPE:
+        """Start tracking the energy sensor."""
+        return async_track_state_change_event(
+            self._hass, [self._energy_entity], self._async_energy_changed
+        )
+
+    @callback
+    def async_add_sensor(
+        self, sensor: TariffEnergy | TariffEnergyCost
+    ) -> CALLBACK_TYPE:
+        """Start accumulating a tariff bucket."""
+        buckets = self._cost if isinstance(sensor, TariffEnergyCost) else self._energy
+        buckets[sensor.tariff] = sensor
+
+        @callback
+        def async_remove_sensor() -> None:
+            buckets.pop(sensor.tariff, None)
+
+        return async_remove_sensor
+
+    @callback
+    def async_add_profile(self, sensor: WeekProfileSensor) -> CALLBACK_TYPE:
+        """Start profiling the split energy."""
+        self._profile = sensor
+
+        @callback
+        def async_remove_profile() -> None:
+            self._profile = None
+
+        return async_remove_profile
+
+    @callback
+    def async_restore_reading(
+        self, last_reading: float | None, last_reading_datetime: datetime | None
+    ) -> None:
+        """Resume from the last reading seen before a restart."""
+        if self.last_reading is None and last_reading_datetime is not None:
+            self.last_reading = last_reading
+            self.last_reading_datetime = last_reading_datetime
+
+    @callback
+    def _async_energy_changed(self, event: Event) -> None:
+        """Add the energy reported since the previous reading to the buckets."""
+        new_state = event.data.get("new_state")
+        if (reading := energy_kwh(new_state)) is None:
+            return
+
+        last_reading, start = self.last_reading, self.last_reading_datetime
+        self.last_reading, self.last_reading_datetime = reading, new_state.last_updated
+        if last_reading is None:
+            return
+
+        delta = reading - last_reading
+        if delta < 0:  # meter reset
+            delta = reading
+        if delta == 0:
+            return
+
+        energy = list(self._data.timeline.split(start, new_state.last_updated, delta))
+        costs = self._bill.async_add_energy(start, new_state.last_updated, energy)
+
+        changed = set()
+        for (tariff, kwh), cost in zip(energy, costs):
+            if (energy_sensor := self._energy.get(tariff)) is not None:
+                energy_sensor.add(kwh)
+                changed.add(energy_sensor)
+            if (cost_sensor := self._cost.get(tariff)) is not None:
+                cost_sensor.add(cost)
+                changed.add(cost_sensor)
+            if self._profile is not None:
+                self._profile.async_add(new_state.last_updated, tariff, kwh, cost)
+
+        for sensor in changed:
+            sensor.async_publish()
+
+
+class TariffEnergy(ERSEEntity, RestoreSensor):
+    """Energy of a tariff metered from the raw energy sensor."""
+
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_suggested_display_precision = ENERGY_PRECISION
+    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+
+    def __init__(self, hass, entry_id, meter, tariff) -> None:
+        """Initialize tariff energy bucket."""
+        super().__init__(hass.data[DOMAIN][entry_id])
+
+        self._attr_name = f"{tariff.value} Energy"
+        self._attr_unique_id = tariff_energy_unique_id(entry_id, tariff)
+        self._attr_native_value: float = 0
+
+        self._meter = meter
+        self.tariff = tariff
+
+    async def async_added_to_hass(self):
+        """Restore the bucket and start accumulating."""
+        await super().async_added_to_hass()
+
+        if (last_sensor_data := await self.async_get_last_sensor_data()) is not None:
+            try:
+                self._attr_native_value = float(last_sensor_data.native_value)
+            except (TypeError, ValueError):
+                pass
+            self._meter.async_restore_reading(
+                last_sensor_data.last_reading, last_sensor_data.last_reading_datetime
+            )
+
+        self.async_on_remove(self._meter.async_add_sensor(self))
+
+    def add(self, kwh: float) -> None:
+        """Add energy to the bucket."""
+        self._attr_native_value += kwh
+
+    @callback
+    def async_publish(self) -> None:
+        """Write the state."""
+        self.async_write_ha_state()
+
+    @property
+    def extra_restore_state_data(self) -> TariffEnergyExtraStoredData:
+        """Return sensor specific state data to be restored."""
+        return TariffEnergyExtraStoredData(
+            self.native_value,
+            self.native_unit_of_measurement,
+            self._meter.last_reading,
+            self._meter.last_reading_datetime,
+        )
+
+    async def async_get_last_sensor_data(
+        self,
+    ) -> TariffEnergyExtraStoredData | None:
+        """Restore Tariff Energy Extra Stored Data."""
+        if (restored_last_extra_data := await self.async_get_last_extra_data()) is None:
+            return None
+
+        return TariffEnergyExtraStoredData.from_dict(restored_last_extra_data.as_dict())
+
+
+class TariffEnergyCost(ERSEMoneyEntity, RestoreSensor):
+    """Cost of the energy of a tariff metered from the raw energy sensor."""
+
+    def __init__(self, hass, entry_id, meter, tariff) -> None:
+        """Initialize tariff cost bucket."""
+        super().__init__(hass.data[DOMAIN][entry_id])
+
+        self._attr_name = f"{tariff.value} Energy Cost"
+        self._attr_unique_id = slugify(f"{entry_id} {tariff} energy cost")
+        self._attr_native_value: float = 0
+
+        self._meter = meter
+        self.tariff = tariff
+        self._signal = SIGNAL_COST_UPDATED.format(entry_id)
+
+    @property
+    def extra_state_attributes(self):
+        return {ATTR_COST: self._operator.plano.custo_tarifa(self.tariff)}
+
+    async def async_added_to_hass(self):
+        """Restore the bucket and start accumulating."""
+        await super().async_added_to_hass()
+
+        if (last_sensor_data := await self.async_get_last_sensor_data()) is not None:
+            try:
+                self._attr_native_value = float(last_sensor_data.native_value)
+            except (TypeError, ValueError):
+                pass
+
+        self.async_on_remove(self._meter.async_add_sensor(self))
+        self.async_publish()
+
+    def add(self, cost: float) -> None:
+        """Add cost to the bucket."""
+        self._attr_native_value += cost
+
+    @callback
+    def async_publish(self) -> None:
+        """Write the state and share the cost with the total and the feed."""
+        self.async_write_ha_state()
+        async_dispatcher_send(
+            self.hass, self._signal, self.unique_id, self._attr_native_value
+        )
+        self._data.feed.async_set_part(
+            (FEED_COST, self.tariff.value), self.unique_id, self._attr_native_value
+        )
+
+
+@dataclass
+class DemandSensorExtraStoredData(SensorExtraStoredData):
+    """Object to store extra QuarterHourDemand data."""
+
+    max_demand: float | None
+    max_demand_datetime: datetime | None
+    cycle_start: str | None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return dictionary version of this object."""
+        data = super().as_dict()
+        data["max_demand"] = self.max_demand
+        if isinstance(self.max_demand_datetime, (datetime)):
+            data["max_demand_datetime"] = self.max_demand_datetime.isoformat()
+        data["cycle_start"] = self.cycle_start
+        return data
+
+    @classmethod
+    def from_dict(cls, restored: dict[str, Any]) -> Self | None:
+        """Initialize a stored sensor state from a dict."""
+        extra = SensorExtraStoredData.from_dict(restored)
+        if extra is None:
+            return None
+
+        try:
+            max_demand = float(restored.get("max_demand"))
+        except (TypeError, ValueError):
+            max_demand = None
+
+        try:
+            max_demand_datetime: datetime | None = dt_util.parse_datetime(
+                restored.get("max_demand_datetime")
+            )
+        except (TypeError, ValueError):
+            max_demand_datetime = None
+
+        return cls(
+            extra.native_value,
+            extra.native_unit_of_measurement,
+            max_demand,
+            max_demand_datetime,
+            restored.get("cycle_start"),
+        )
+
+
+class QuarterHourDemand(ERSEEntity, RestoreSensor):
+    """Average demand of each quarter-hour, integrated from a power sensor.
+
+    The power is integrated with the trapezoidal rule as samples arrive and
+    held constant from the last sample up to the end of the interval, so
+    memory use does not depend on how often the power sensor reports.
+    """
+
+    _attr_translation_key = "demand"
+    _attr_device_class = SensorDeviceClass.POWER
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfPower.KILO_WATT
+    _attr_suggested_display_precision = ENERGY_PRECISION
+
+    def __init__(self, hass, entry_id, power_entity, meters) -> None:
+        """Initialize demand tracker."""
+        super().__init__(hass.data[DOMAIN][entry_id])
+
+        self._attr_unique_id = slugify(f"{entry_id} {power_entity} demand")
+
+        self._power_entity = power_entity
+        self._meters = meters
+        self._power: float | None = None  # kW
+        self._power_datetime: datetime | None = None
+        self._energy: float = 0  # kW.s since the start of the interval
+        self._interval_start: datetime | None = None
+        self._max_demand: float | None = None
+        self._max_demand_datetime: datetime | None = None
+        self._cycle_start: str | None = None
+
+    async def async_added_to_hass(self):
+        """Restore the cycle maximum and start integrating."""
+        await super().async_added_to_hass()
+
+        if (last_sensor_data := await self.async_get_last_sensor_data()) is not None:
+            self._attr_native_value = last_sensor_data.native_value
+            self._max_demand = last_sensor_data.max_demand
+            self._max_demand_datetime = last_sensor_data.max_demand_datetime
+            self._cycle_start = last_sensor_data.cycle_start
+
+        now = dt_util.utcnow()
+        self._interval_start = now
+        self._async_sample(self.hass.states.get(self._power_entity), now)
+
+        self.async_on_remove(
+            async_track_state_change_event(
+                self.hass, [self._power_entity], self._async_power_changed
+            )
+        )
+        self.async_on_remove(
+            async_track_time_change(
+                self.hass, self._async_interval_end, minute=range(0, 60, 15), second=0
+            )
+        )
+
+    @callback
+    def _async_sample(self, state: State | None, when: datetime) -> None:
+        """Integrate up to a new power sample."""
+        power = None
+        if state is not None and state.state not in [STATE_UNAVAILABLE, STATE_UNKNOWN]:
+            unit = state.attributes.get(ATTR_UNIT_OF_MEASUREMENT)
+            try:
+                if unit == UnitOfPower.KILO_WATT:
+                    power = float(state.state)
+                elif unit == UnitOfPower.WATT:
+                    power = float(state.state) / 1000
+            except ValueError:
+                pass
+
+        if self._power is not None and power is not None:
+            elapsed = max((when - self._power_datetime).total_seconds(), 0)
+            self._energy += (self._power + power) / 2 * elapsed
+
+        self._power, self._power_datetime = power, when
+
+    @callback
+    def _async_power_changed(self, event: Event) -> None:
+        """Handle a new power reading."""
+        new_state = event.data.get("new_state")
+        self._async_sample(new_state, new_state.last_updated if new_state else None)
+
+    @callback
+    def _async_interval_end(self, now: datetime) -> None:
+        """Publish the average demand of the interval that just ended."""
+        now = dt_util.as_utc(now).replace(second=0, microsecond=0)
+
+        if self._power is not None:
+            elapsed = max((now - self._power_datetime).total_seconds(), 0)
+            self._energy += self._power * elapsed
+            self._power_datetime = now
+
+        if (duration := (now - self._interval_start).total_seconds()) > 0:
+            self._attr_native_value = round(self._energy / duration, ENERGY_PRECISION)
+        self._energy = 0
+        self._interval_start = now
+
+        if (
+            start := last_cycle_start(self.hass, self._meters)
+        ) is not None and start != self._cycle_start:
+            # a new billing cycle started
+            self._cycle_start = start
+            self._max_demand = None
+
+        if self._attr_native_value is not None and (
+            self._max_demand is None or self._attr_native_value > self._max_demand
+        ):
+            self._max_demand = self._attr_native_value
+            self._max_demand_datetime = now
+
+        _LOGGER.debug(
+            "Demand = %s kW, max = %s kW", self._attr_native_value, self._max_demand
+        )
+        self.async_write_ha_state()
+
+    @property
+    def extra_state_attributes(self):
+        return {
+            ATTR_MAX_DEMAND: self._max_demand,
+            ATTR_MAX_DEMAND_DATETIME: self._max_demand_datetime,
+        }
+
+    @property
+    def extra_restore_state_data(self) -> DemandSensorExtraStoredData:
+        """Return sensor specific state data to be restored."""
+        return DemandSensorExtraStoredData(
+            self.native_value,
+            self.native_unit_of_measurement,
+            self._max_demand,
+            self._max_demand_datetime,
+            self._cycle_start,
+        )
+
+    async def async_get_last_sensor_data(
+        self,
+    ) -> DemandSensorExtraStoredData | None:
+        """Restore Demand Sensor Extra Stored Data."""
+        if (restored_last_extra_data := await self.async_get_last_extra_data()) is None:
+            return None
+
+        return DemandSensorExtraStoredData.from_dict(restored_last_extra_data.as_dict())
+
+
+@dataclass
+class BillExtraStoredData(SensorExtraStoredData):
+    """Object to store extra BillComponent data."""
+
+    bill: dict[str, Any] | None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return dictionary version of this object."""
+        data = super().as_dict()
+        data["bill"] = self.bill
+        return data
+
+    @classmethod
+    def from_dict(cls, restored: dict[str, Any]) -> Self | None:
+        """Initialize a stored sensor state from a dict."""
+        extra = SensorExtraStoredData.from_dict(restored)
+        if extra is None:
+            return None
+
+        return cls(
+            extra.native_value,
+            extra.native_unit_of_measurement,
+            restored.get("bill"),
+        )
+
+
+class BillTracker:
+    """Keep the bill breakdown of the cycle up to date with the tariff meters.
+
+    Only the meters of each tariff with the longest cycle are added up, so a
+    tariff also read by a daily meter is neither counted twice nor starts a
+    new cycle every day.
+    """
+
+    def __init__(self, hass, data: ERSEData, meters: dict[str, Tarifa]) -> None:
+        """Initialize the tracker."""
+        self._hass = hass
+        self._data = data
+        self._meters = meters
+        self._cycle_meters: dict[str, Tarifa] = {}
+        self._sensors: dict[str, BillComponent] = {}
+        self._listeners: list[CALLBACK_TYPE] = []
+        self._unsubs: list[CALLBACK_TYPE] = []
+        self.engine = BillEngine(data.operator.plano)
+
+    @callback
+    def async_add_listener(self, listener: CALLBACK_TYPE) -> CALLBACK_TYPE:
+        """Call listener each time the bill is updated."""
+        self._listeners.append(listener)
+
+        @callback
+        def async_remove_listener() -> None:
+            self._listeners.remove(listener)
+
+        return async_remove_listener
+
+    @callback
+    def async_add_sensor(
+        self, sensor: BillComponent, restored: dict[str, Any] | None
+    ) -> CALLBACK_TYPE:
+        """Publish a bill component, the first one starts the tracking."""
+        self._sensors[sensor.component] = sensor
+
+        if not self._unsubs:
+            self.engine.restore(restored)
+            # catch up with what the meters read while we were not running
+            self._async_update_cycle_meters()
+            for meter in self._meters:
+                self._async_reading(meter, self._hass.states.get(meter))
+
+            self._unsubs = [
+                async_track_state_change_event(
+                    self._hass, list(self._meters), self._async_meter_changed
+                ),
+                async_track_time_change(
+                    self._hass, self._async_update, hour=0, minute=0, second=0
+                ),
+            ]
+
+        self._async_update()
+
+        @callback
+        def async_remove_sensor() -> None:
+            self._sensors.pop(sensor.component, None)
+            if not self._sensors:
+                while self._unsubs:
+                    self._unsubs.pop()()
+
+        return async_remove_sensor
+
+    @callback
+    def _async_update_cycle_meters(self) -> None:
+        """Follow the meters with the longest cycle of each tariff."""
+        meters = cycle_meters(self._hass, self._meters)
+        if meters != self._cycle_meters:
+            _LOGGER.debug(
+                "Bill adds up %s, leaving out %s",
+                list(meters),
+                [meter for meter in self._meters if meter not in meters],
+            )
+            self._cycle_meters = meters
+
+    @callback
+    def _async_reading(self, meter: str, state: State | None) -> None:
+        """Add the energy read by a meter since its previous reading."""
+        if meter not in self._cycle_meters or (kwh := energy_kwh(state)) is None:
+            return
+
+        if (cycle_start := state.attributes.get(ATTR_LAST_RESET)) is not None and (
+            self.engine.cycle_start is None
+            or dt_util.parse_datetime(cycle_start)
+            > dt_util.parse_datetime(self.engine.cycle_start)
+        ):
+            _LOGGER.debug("New billing cycle started at %s", cycle_start)
+            self.engine.cycle_start = cycle_start
+            self.engine.reset()
+
+        delta = kwh - self.engine.readings.get(meter, 0)
+        if delta < 0:  # meter reset
+            delta = kwh
+        self.engine.readings[meter] = kwh
+
+        tariff = self._meters[meter]
+        self.engine.add(
+            tariff, delta, self._data.prices.price(tariff, state.last_updated)
+        )
+
+    @callback
+    def async_add_energy(
+        self, start: datetime, end: datetime, energy: list[tuple[Tarifa, float]]
+    ) -> list[float]:
+        """Add the energy of each tariff metered from the raw energy sensor.
+
+        That energy is never reset, so the cycle starts with the first of it.
+        Returns the final cost of each part of the energy.
+        """
+        if self.engine.cycle_start is None:
+            self.engine.cycle_start = start.isoformat()
+
+        costs = []
+        for tariff, kwh in energy:
+            cost = self.engine.energy_cost()
+            self.engine.add(tariff, kwh, self._data.prices.price(tariff, end))
+            costs.append(self.engine.energy_cost() - cost)
+        self._async_update()
+        return costs
+
+    @callback
+    def _async_meter_changed(self, event: Event) -> None:
+        """Handle a new meter reading."""
+        self._async_update_cycle_meters()
+        self._async_reading(event.data["entity_id"], event.data.get("new_state"))
+        self._async_update()
+
+    @callback
+    def _async_update(self, _=None) -> None:
+        """Publish the bill components."""
+        days = 0
+        if self.engine.cycle_start is not None:
+            days = (
+                dt_util.now() - dt_util.parse_datetime(self.engine.cycle_start)
+            ).days
+
+        for component, value in self.engine.breakdown(days).items():
+            if (sensor := self._sensors.get(component)) is not None:
+                sensor.async_set(value)
+        for listener in self._listeners:
+            listener()
+
+
+class BillComponent(ERSEMoneyEntity, RestoreSensor):
+    """A component of the electricity bill of the current cycle."""
+
+    def __init__(self, hass, entry_id, tracker, component) -> None:
+        """Initialize bill component."""
+        super().__init__(hass.data[DOMAIN][entry_id])
+
+        self._attr_translation_key = f"bill_{component}"
+        self._attr_unique_id = slugify(f"{entry_id} bill {component}")
+
+        self._tracker = tracker
+        self.component = component
+
+    async def async_added_to_hass(self):
+        """Restore the cycle and start tracking."""
+        await super().async_added_to_hass()
+
+        restored = None
+        if (last_sensor_data := await self.async_get_last_sensor_data()) is not None:
+            self._attr_native_value = last_sensor_data.native_value
+            restored = last_sensor_data.bill
+
+        self.async_on_remove(self._tracker.async_add_sensor(self, restored))
+
+    @callback
+    def async_set(self, value: float) -> None:
+        """Update the component, writing the state only if the cents changed."""
+        previous = self._attr_native_value
+        self._attr_native_value = value
+        if previous is None or round(previous, COST_PRECISION) != round(
+            value, COST_PRECISION
+        ):
+            self.async_write_ha_state()
+
+    @property
+    def extra_restore_state_data(self) -> BillExtraStoredData:
+        """Return sensor specific state data to be restored."""
+        return BillExtraStoredData(
+            self.native_value,
+            self.native_unit_of_measurement,
+            self._tracker.engine.as_dict(),
+        )
+
+    async def async_get_last_sensor_data(
+        self,
+    ) -> BillExtraStoredData | None:
+        """Restore Bill Extra Stored Data."""
+        if (restored_last_extra_data := await self.async_get_last_extra_data()) is None:
+            return None
+
+        return BillExtraStoredData.from_dict(restored_last_extra_data.as_dict())
+
+
+@dataclass
+class WeekProfileExtraStoredData(SensorExtraStoredData):
+    """Object to store extra WeekProfileSensor data."""
+
+    profile: dict[str, Any] | None
+    readings: dict[str, float]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return dictionary version of this object."""
+        data = super().as_dict()
+        data["profile"] = self.profile
+        data["readings"] = self.readings
+        return data
+
+    @classmethod
+    def from_dict(cls, restored: dict[str, Any]) -> Self | None:
+        """Initialize a stored sensor state from a dict."""
+        extra = SensorExtraStoredData.from_dict(restored)
+        if extra is None:
+            return None
+
+        try:
+            readings = {
+                meter: float(value)
+                for meter, value in restored.get("readings", {}).items()
+            }
+        except (AttributeError, TypeError, ValueError):
+            readings = {}
+
+        return cls(
+            extra.native_value,
+            extra.native_unit_of_measurement,
+            restored.get("profile"),
+            readings,
+        )
+
+
+class WeekProfileSensor(ERSEEntity, RestoreSensor):
+    """Consumption by hour of the week, with its cost, of each tariff.
+
+    Costs are final, with the excise tax and the VAT rate of the bill of the
+    cycle, like the tariff costs. Like the bill, only the meters of each tariff
+    with the longest cycle are added up, or the energy split from the raw
+    energy sensor.
+    """
+
+    _attr_translation_key = "profile"
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_suggested_display_precision = ENERGY_PRECISION
+    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+
+    def __init__(
+        self,
+        hass,
+        entry_id,
+        meters: dict[str, Tarifa],
+        bill: BillTracker,
+        tariff_meter: TariffMeterTracker | None,
+    ) -> None:
+        """Initialize the profile of the tariff meters."""
+        super().__init__(hass.data[DOMAIN][entry_id])
+
+        self._attr_unique_id = slugify(f"{entry_id} week profile")
+
+        self._meters = meters
+        self._cycle_meters = meters
+        self._bill = bill
+        self._tariff_meter = tariff_meter
+        self._readings: dict[str, float] = {}
+        self._profile = WeekProfile(self._operator.plano.tarifas)
+
+    async def async_added_to_hass(self):
+        """Restore the profile and follow the tariff meters."""
+        await super().async_added_to_hass()
+
+        if (last_sensor_data := await self.async_get_last_sensor_data()) is not None:
+            self._profile.restore(last_sensor_data.profile)
+            self._readings = last_sensor_data.readings
+
+        # catch up with what the meters read while we were not running
+        self._cycle_meters = cycle_meters(self.hass, self._meters)
+        for meter in self._meters:
+            self._async_reading(meter, self.hass.states.get(meter))
+        self._attr_native_value = self._profile.total_kwh
+
+        self.async_on_remove(
+            async_track_state_change_event(
+                self.hass, list(self._meters), self._async_meter_changed
+            )
+        )
+        if self._tariff_meter is not None:
+            self.async_on_remove(self._tariff_meter.async_add_profile(self))
+
+    @callback
+    def async_add(
+        self, when: datetime, tariff: Tarifa, kwh: float, cost: float
+    ) -> None:
+        """Add energy split from the raw energy sensor, with its final cost."""
+        self._profile.add(when, tariff, kwh, cost)
+        self._attr_native_value = self._profile.total_kwh
+        self.async_write_ha_state()
+
+    @callback
+    def _async_reading(self, meter: str, state: State | None) -> bool:
+        """Add the energy read by a meter since its previous reading."""
+        if (kwh := energy_kwh(state)) is None:
+            return False
+
+        last = self._readings.get(meter)
+        self._readings[meter] = kwh
+        if last is None or meter not in self._cycle_meters:
+            return False
+
+        delta = kwh - last
+        if delta < 0:  # meter reset
+            delta = kwh
+        if delta == 0:
+            return False
+
+        tariff = self._meters[meter]
+        price = self._data.prices.price(tariff, state.last_updated)
+        self._profile.add(
+            state.last_updated,
+            tariff,
+            delta,
+            delta * self._bill.engine.unit_price(tariff, price),
+        )
+        return True
+
+    @callback
+    def _async_meter_changed(self, event: Event) -> None:
+        """Handle a new meter reading."""
+        self._cycle_meters = cycle_meters(self.hass, self._meters)
+        if self._async_reading(event.data["entity_id"], event.data.get("new_state")):
+            self._attr_native_value = self._profile.total_kwh
+            self.async_write_ha_state()
+
+    @property
+    def extra_state_attributes(self):
+        return {ATTR_SINCE: self._profile.since}
+
+    async def async_get_profile(self) -> ServiceResponse:
+        """Return the energy and cost bins of each tariff."""
+        return self._profile.as_response()
+
+    @property
+    def extra_restore_state_data(self) -> WeekProfileExtraStoredData:
+        """Return sensor specific state data to be restored."""
+        return WeekProfileExtraStoredData(
+            self.native_value,
+            self.native_unit_of_measurement,
+            self._profile.as_dict(),
+            self._readings,
+        )
+
+    async def async_get_last_sensor_data(
+        self,
+    ) -> WeekProfileExtraStoredData | None:
+        """Restore Week Profile Extra Stored Data."""
+        if (restored_last_extra_data := await self.async_get_last_extra_data()) is None:
+            return None
+
+        return WeekProfileExtraStoredData.from_dict(restored_last_extra_data.as_dict())
+
+
+class UnitPrice(ERSEEntity, SensorEntity):
+    """Final unit price of the tariff in force, only updated when it changes.
+
+    The price includes the excise tax and the VAT rate the next kWh would be
+    billed at, so it matches the tariff costs. Besides the tariff boundaries
+    and new prices, it changes when the tariff uses up its reduced VAT
+    plafond of the cycle.
+    """
+
+    _attr_translation_key = "unit_price"
+    _attr_native_unit_of_measurement = f"{CURRENCY_EURO}/{UnitOfEnergy.KILO_WATT_HOUR}"
+    _attr_suggested_display_precision = 4
+
+    def __init__(self, hass, entry_id, bill) -> None:
+        """Initialize the unit price of a plan."""
+        super().__init__(hass.data[DOMAIN][entry_id])
+
+        self._attr_unique_id = slugify(f"{entry_id} unit price")
+        self._entry_id = entry_id
+        self._bill = bill
+        self._tariff: Tarifa | None = None
+        self._next_transition: tuple[datetime, Tarifa] | None = None
+
+    async def async_added_to_hass(self):
+        """Follow the tariff changes and the prices of the options."""
+        await super().async_added_to_hass()
+
+        self.async_on_remove(
+            self.hass.bus.async_listen(EVENT_TARIFF_CHANGED, self._async_tariff_changed)
+        )
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_PRICES_UPDATED.format(self._entry_id),
+                self._async_update,
+            )
+        )
+        self.async_on_remove(self._bill.async_add_listener(self._async_bill_updated))
+
+        self._tariff = self._data.timeline.tariff_at()
+        self._next_transition = self._data.timeline.next_transition()
+        self._async_update()
+
+    @callback
+    def _async_tariff_changed(self, event: Event) -> None:
+        """Switch to the tariff of the boundary that was just crossed."""
+        if event.data.get(ATTR_ENTRY_ID) != self._entry_id:
+            return
+
+        self._tariff = Tarifa(event.data[ATTR_TARIFF])
+        self._next_transition = None
+        if (next_transition := event.data.get(ATTR_NEXT_TRANSITION)) is not None:
+            self._next_transition = (
+                dt_util.parse_datetime(next_transition),
+                Tarifa(event.data[ATTR_NEXT_TARIFF]),
+            )
+        self._async_update()
+
+    @callback
+    def _async_bill_updated(self) -> None:
+        """Publish the price if the VAT rate of the tariff in force changed."""
+        if self._tariff is not None and self._price() != self._attr_native_value:
+            self._async_update()
+
+    @callback
+    def _async_update(self) -> None:
+        """Publish the price of the tariff in force."""
+        self._attr_native_value = self._price()
+        self.async_write_ha_state()
+
+    def _price(self) -> float:
+        """Final price of the next kWh of the tariff in force."""
+        return self._bill.engine.unit_price(
+            self._tariff, self._operator.plano.custo_tarifa(self._tariff)
+        )
+
+    @property
+    def extra_state_attributes(self):
+        next_transition, next_tariff = self._next_transition or (None, None)
+        return {
+            ATTR_COST: self._operator.plano.custo_tarifa(self._tariff)
+            if self._tariff
+            else None,
+            ATTR_TARIFF: self._tariff.value if self._tariff else None,
+            ATTR_NEXT_TARIFF: next_tariff.value if next_tariff else None,
+            ATTR_NEXT_TRANSITION: next_transition,
+        }
@@ -0,0 +1,116 @@
+"""Precomputed tariff timeline of an electricity plan."""
+from __future__ import annotations
+
+from collections.abc import Iterator
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+from homeassistant.util import dt as dt_util
+from pyerse.comercializador import Plano, Tarifa
+
+SLOT = timedelta(minutes=15)
+SLOTS_PER_DAY = 96
+
+DAY_CACHE_SIZE = 64
+TRANSITION_HORIZON = 8  # days, longer than a weekly cycle
+
+
+class TariffTimeline:
+    """Tariff of every quarter-hour, computed once per day.
+
+    All regulated periods start and end on quarter-hours, so the tariff of a
+    whole day is resolved with 96 calls to the plan and then looked up by index.
+    """
+
+    def __init__(self, plano: Plano) -> None:
+        """Initialize the timeline of a plan."""
+        self._plano = plano
+        self._day_slots = lru_cache(maxsize=DAY_CACHE_SIZE)(self._compute_day)
+
+    def _compute_day(self, day: date) -> tuple[Tarifa, ...]:
+        """Tariff of each quarter-hour of a day (local wall clock)."""
+        start = datetime.combine(day, time())
+        return tuple(
+            self._plano.tarifa_actual(start + index * SLOT)
+            for index in range(SLOTS_PER_DAY)
+        )
+
+    def tariff_at(self, when: datetime | None = None) -> Tarifa:
+        """Tariff in force at a given moment (now by default)."""
+        when = dt_util.as_local(when) if when else dt_util.now()
+        return self._day_slots(when.date())[when.hour * 4 + when.minute // 15]
+
+    def next_transition(
+        self, when: datetime | None = None
+    ) -> tuple[datetime, Tarifa] | None:
+        """First tariff change after a moment and the tariff it changes to."""
+        when = dt_util.as_local(when) if when else dt_util.now()
+        tariff = self.tariff_at(when)
+
+        day = when.date()
+        first = when.hour * 4 + when.minute // 15 + 1
+        for _ in range(TRANSITION_HORIZON):
+            slots = self._day_slots(day)
+            for index in range(first, SLOTS_PER_DAY):
+                if slots[index] != tariff:
+                    return (
+                        datetime.combine(
+                            day, time(index // 4, index % 4 * 15), tzinfo=when.tzinfo
+                        ),
+                        slots[index],
+                    )
+            day += timedelta(days=1)
+            first = 0
+
+        # single tariff plans never change
+        return None
+
+    def periods(
+        self, start: datetime, end: datetime
+    ) -> Iterator[tuple[datetime, datetime, Tarifa]]:
+        """Tariff periods between two moments, clipped to the range."""
+        start = dt_util.as_local(start)
+        end = dt_util.as_local(end)
+        if start >= end:
+            return
+
+        day = start.date()
+        first = start.hour * 4 + start.minute // 15 + 1
+        period_start, tariff = start, self.tariff_at(start)
+        while True:
+            slots = self._day_slots(day)
+            for index in range(first, SLOTS_PER_DAY):
+                if slots[index] == tariff:
+                    continue
+                slot_start = datetime.combine(
+                    day, time(index // 4, index % 4 * 15), tzinfo=start.tzinfo
+                )
+                if slot_start >= end:
+                    yield period_start, end, tariff
+                    return
+                yield period_start, slot_start, tariff
+                period_start, tariff = slot_start, slots[index]
+
+            day += timedelta(days=1)
+            first = 0
+            if datetime.combine(day, time(), tzinfo=start.tzinfo) >= end:
+                yield period_start, end, tariff
+                return
+
+    def split(
+        self, start: datetime, end: datetime, amount: float
+    ) -> Iterator[tuple[Tarifa, float]]:
+        """Split an amount spread evenly between two moments by tariff."""
+        tariff = self.tariff_at(end)
+        if end - start < SLOT and self.tariff_at(start) == tariff:
+            # no tariff period is shorter than a slot
+            yield tariff, amount
+            return
+
+        span = (end - start).total_seconds()
+        if span <= 0:
+            yield tariff, amount
+            return
+
+        for period_start, period_end, tariff in self.periods(start, end):
+            yield tariff, amount * (period_end - period_start).total_seconds() / span
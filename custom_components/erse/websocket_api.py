@@ -0,0 +1,82 @@
+"""WebSocket API of the Entidade Reguladora dos Serviços Energéticos integration."""
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import voluptuous as vol
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN, SUBSCRIBE_MIN_INTERVAL
+from .feed import FeedKey, encode
+
+
+@callback
+def async_setup(hass: HomeAssistant) -> None:
+    """Register the WebSocket commands."""
+    websocket_api.async_register_command(hass, ws_subscribe)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "erse/subscribe",
+        vol.Required("entry_id"): str,
+        vol.Optional("min_interval", default=SUBSCRIBE_MIN_INTERVAL): vol.All(
+            vol.Coerce(float), vol.Range(min=0)
+        ),
+    }
+)
+@callback
+def ws_subscribe(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Send a snapshot of the costs of an entry followed by throttled deltas."""
+    if (data := hass.data.get(DOMAIN, {}).get(msg["entry_id"])) is None:
+        connection.send_error(msg["id"], websocket_api.ERR_NOT_FOUND, "Entry not found")
+        return
+
+    min_interval = msg["min_interval"]
+    pending: dict[FeedKey, Any] = {}
+    last_sent = 0.0
+    unsub_timer = None
+
+    @callback
+    def async_flush(_=None) -> None:
+        nonlocal last_sent, unsub_timer
+        unsub_timer = None
+        if not pending:
+            return
+        connection.send_message(
+            websocket_api.event_message(msg["id"], {"delta": encode(pending)})
+        )
+        pending.clear()
+        last_sent = time.monotonic()
+
+    @callback
+    def async_feed_changed(key: FeedKey, value: Any) -> None:
+        nonlocal unsub_timer
+        pending[key] = value
+        if unsub_timer is not None:
+            return
+        if (delay := last_sent + min_interval - time.monotonic()) <= 0:
+            async_flush()
+        else:
+            unsub_timer = async_call_later(hass, delay, async_flush)
+
+    unsub_feed = data.feed.async_subscribe(async_feed_changed)
+
+    @callback
+    def async_unsubscribe() -> None:
+        unsub_feed()
+        if unsub_timer is not None:
+            unsub_timer()
+
+    connection.subscriptions[msg["id"]] = async_unsubscribe
+    connection.send_result(msg["id"])
+    connection.send_message(
+        websocket_api.event_message(msg["id"], {"snapshot": data.feed.snapshot()})
+    )
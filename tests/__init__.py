@@ -0,0 +1 @@
+"""Tests for the Entidade Reguladora dos Serviços Energéticos integration."""
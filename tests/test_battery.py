@@ -0,0 +1,45 @@
+"""Test the battery schedule optimizer."""
+import importlib.util
+import sys
+from pathlib import Path
+
+# battery.py only needs the standard library, load it without the package
+# __init__ so the optimizer can be tested without Home Assistant
+BATTERY = Path(__file__).parents[1] / "custom_components" / "erse" / "battery.py"
+spec = importlib.util.spec_from_file_location("erse_battery", BATTERY)
+battery = importlib.util.module_from_spec(spec)
+sys.modules[spec.name] = battery
+spec.loader.exec_module(battery)
+
+SLOT_HOURS = battery.SLOT_HOURS
+optimize_battery = battery.optimize_battery
+
+STEPS = 50
+
+
+def test_sub_step_load_is_discharged() -> None:
+    """A load smaller than a state of charge step is still supplied."""
+    prices = [0.10] * 32 + [0.25] * 64
+    load = [0.5 * SLOT_HOURS] * len(prices)
+
+    schedule = optimize_battery(prices, load, 10, 3, 3, 0.9, 5, STEPS)
+
+    expensive = schedule[32:]
+    assert sum(slot.discharge for slot in expensive) > 0
+    assert all(slot.grid == 0 for slot in expensive[:8])
+    assert sum(slot.cost for slot in schedule) < sum(
+        price * energy for price, energy in zip(prices, load)
+    )
+
+
+def test_sub_step_charge_power() -> None:
+    """A charge power below a state of charge step per slot still charges."""
+    prices = [0.10] * 32 + [0.25] * 64
+    load = [1.0 * SLOT_HOURS] * len(prices)
+
+    schedule = optimize_battery(prices, load, 13.5, 1, 3, 0.9, 0, STEPS)
+
+    assert schedule[0].charge == 1 * SLOT_HOURS
+    assert max(slot.soc for slot in schedule) > 0
+    assert all(0 <= slot.soc <= 13.5 for slot in schedule)
+    assert all(slot.grid >= 0 for slot in schedule)